@@ -0,0 +1,54 @@
+import time
+
+
+class AdmissionController:
+    """Decides whether new expensive work is admitted or shed.
+
+    Tracks in-flight searches (plus any queued behind them) and a moving
+    average of how long updates wait between arriving at the webhook and
+    reaching a handler.
+    """
+
+    def __init__(self, max_inflight=8, max_queue_delay=5.0, max_queue_size=100, smoothing=0.3):
+        self.max_inflight = max_inflight
+        self.max_queue_delay = max_queue_delay
+        self.max_queue_size = max_queue_size
+        self.smoothing = smoothing
+        self.inflight = 0
+        self.queue_delay = 0.0
+        self.sampled_at = 0.0
+        self.shed = 0
+        self._received = {}
+
+    def received(self, update_id):
+        self._received[update_id] = time.monotonic()
+
+    def dispatched(self, update_id):
+        received_at = self._received.pop(update_id, None)
+        if received_at is not None:
+            now = time.monotonic()
+            self.queue_delay += self.smoothing * (now - received_at - self.queue_delay)
+            self.sampled_at = now
+
+    def overloaded(self, queue_size=0, queued=0):
+        # A delay sample only counts while it is fresh; shed updates never
+        # reach a handler, so a stale average would otherwise never recover.
+        delay_fresh = time.monotonic() - self.sampled_at < 2 * self.max_queue_delay
+        return (
+            self.inflight + queued >= self.max_inflight
+            or (delay_fresh and self.queue_delay > self.max_queue_delay)
+            or queue_size > self.max_queue_size
+        )
+
+    def admit(self, queue_size=0, queued=0):
+        if self.overloaded(queue_size, queued):
+            self.shed += 1
+            return False
+        return True
+
+    def __enter__(self):
+        self.inflight += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self.inflight -= 1
@@ -1,16 +1,40 @@
 import os
+import asyncio
+import signal
+import hashlib
+import sqlite3
 import logging
-import requests
 from dotenv import load_dotenv
 from aiohttp import web
 from telegram import Update, Bot, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.helpers import escape_markdown
+from telegram.request import HTTPXRequest
 from telegram.ext import (
     Application,
     CommandHandler,
     CallbackQueryHandler,
     ContextTypes,
+    TypeHandler,
 )
 
+from admission import AdmissionController
+from cache import QueryPopularity, ResultCache
+from cookies import CookieManager
+from enrich import TitleEnricher, describe
+from export import ResultExport
+from facets import FACETS, SORTS, ResultView
+from fanout import SearchFailed, SearchRun
+from index import ResultIndex
+from jackett import JackettClient, infohash
+from jobs import JobQueue
+from query import CanonicalQuery, canonicalize
+from runner import UpdateDispatcher, poll_updates
+from scrape import SeederRefresher
+from snapshot import Snapshot, write_snapshot
+from stats import IndexerStats
+from torrent import MetadataUnavailable, TorrentMetadata
+from watch import WatchScheduler, WatchStore
+
 load_dotenv("/shared/envs/.env")
 
 logging.basicConfig(level=logging.INFO)
@@ -20,67 +44,399 @@ TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 JACKETT_API_KEY = os.getenv("JACKETT_API_KEY")
 JACKETT_API_URL = os.getenv("JACKETT_API_URL")
 WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+FLARESOLVERR_URL = os.getenv("FLARESOLVERR_URL")
+BOT_MODE = os.getenv("BOT_MODE", "webhook" if WEBHOOK_URL else "polling")
 
-if not all([TELEGRAM_BOT_TOKEN, JACKETT_API_KEY, JACKETT_API_URL, WEBHOOK_URL]):
+if not all([TELEGRAM_BOT_TOKEN, JACKETT_API_KEY, JACKETT_API_URL]):
     raise EnvironmentError("Missing required environment variables.")
+if BOT_MODE not in ("webhook", "polling") or (BOT_MODE == "webhook" and not WEBHOOK_URL):
+    raise EnvironmentError("BOT_MODE must be 'polling', or 'webhook' with WEBHOOK_URL set.")
 
 RESULTS_PER_PAGE = 2
+ADMIN_USER_IDS = {int(i) for i in os.getenv("ADMIN_USER_IDS", "").split(",") if i.strip()}
+BOT_CONFIG_DIR = os.getenv("BOT_CONFIG_DIR", "/bot_config")
+WATCH_INTERVAL = int(os.getenv("WATCH_INTERVAL", 3600))
+WATCH_MAX_PER_CHAT = int(os.getenv("WATCH_MAX_PER_CHAT", 10))
+WATCH_NOTIFY_LIMIT = 5
+CACHE_TTL = int(os.getenv("CACHE_TTL", 600))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 500))
+SEARCH_MIN_DEADLINE = float(os.getenv("SEARCH_MIN_DEADLINE", 3))
+SEARCH_MAX_DEADLINE = float(os.getenv("SEARCH_MAX_DEADLINE", 15))
+JACKETT_LATE_TIMEOUT = float(os.getenv("JACKETT_LATE_TIMEOUT", 60))
+LATE_EDIT_INTERVAL = 3
+SEARCH_WORKERS = int(os.getenv("SEARCH_WORKERS", 4))
+JOB_BUDGET = float(os.getenv("JOB_BUDGET", 90))
+INDEXER_REFRESH_INTERVAL = 3600
+MAX_INFLIGHT_SEARCHES = int(os.getenv("MAX_INFLIGHT_SEARCHES", 8))
+MAX_QUEUE_DELAY = float(os.getenv("MAX_QUEUE_DELAY", 5))
+MAX_QUEUE_SIZE = int(os.getenv("MAX_QUEUE_SIZE", 100))
+EXPENSIVE_COMMANDS = ("/search", "/bulk")
+START_TEXT = "Welcome to Jackett Search Bot!\nUse /search <query> to search."
+EXPIRED_MESSAGE = "These results have expired, please search again."
+INDEX_PREVIEW_NOTE = "⚡ From local index, live search still running…"
+INDEX_FALLBACK_NOTE = "⚠️ Jackett is unavailable, showing previously indexed results."
+BUSY_MESSAGE = "⏳ The bot is busy right now, please retry your search in a few seconds."
+UPDATE_CONCURRENCY = int(os.getenv("UPDATE_CONCURRENCY", 32))
+POLL_TIMEOUT = int(os.getenv("POLL_TIMEOUT", 50))
+POLL_LIMIT = int(os.getenv("POLL_LIMIT", 100))
+METADATA_CONCURRENCY = int(os.getenv("METADATA_CONCURRENCY", 2))
+METADATA_MAX_BYTES = int(os.getenv("METADATA_MAX_BYTES", 4 * 1024 * 1024))
+FILE_LIST_LIMIT = 20
+FILE_PATH_MAX = 120
+MESSAGE_MAX = 4096
+LIVE_SCRAPE = os.getenv("LIVE_SCRAPE", "false").lower() in ("1", "true", "yes")
+SCRAPE_DEADLINE = float(os.getenv("SCRAPE_DEADLINE", 1.5))
+SCRAPE_TTL = int(os.getenv("SCRAPE_TTL", 300))
+COOKIE_REFRESH_MARGIN = int(os.getenv("COOKIE_REFRESH_MARGIN", 600))
+COOKIE_DEFAULT_TTL = int(os.getenv("COOKIE_DEFAULT_TTL", 1800))
+COOKIE_INDEXERS = [i for i in os.getenv("COOKIE_INDEXERS", "").split(",") if i]
+INDEX_MAX_ROWS = int(os.getenv("INDEX_MAX_ROWS", 200000))
+INDEX_MAX_AGE_DAYS = int(os.getenv("INDEX_MAX_AGE_DAYS", 30))
+INDEX_COMPACT_INTERVAL = int(os.getenv("INDEX_COMPACT_INTERVAL", 6 * 3600))
+SNAPSHOT_PATH = os.path.join(BOT_CONFIG_DIR, "warm_state.snap")
+WARM_QUERIES = int(os.getenv("WARM_QUERIES", 20))
+WARM_DELAY = 60
+SNAPSHOT_INTERVAL = int(os.getenv("SNAPSHOT_INTERVAL", 1800))
+BULK_MAX_QUERIES = int(os.getenv("BULK_MAX_QUERIES", 50))
+BULK_CONCURRENCY = int(os.getenv("BULK_CONCURRENCY", 3))
+
+jackett = JackettClient(JACKETT_API_URL, JACKETT_API_KEY)
+watch_store = WatchStore(os.path.join(BOT_CONFIG_DIR, "watches.json"))
+result_cache = ResultCache(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES)
+indexer_stats = IndexerStats()
+query_popularity = QueryPopularity()
+active_runs = {}
+search_jobs = JobQueue(
+    lambda job: execute_search(job),
+    lambda subscriber, outcome: deliver_search(subscriber, outcome),
+    workers=SEARCH_WORKERS,
+    budget=JOB_BUDGET,
+)
+admission = AdmissionController(MAX_INFLIGHT_SEARCHES, MAX_QUEUE_DELAY, MAX_QUEUE_SIZE)
+jackett_indexers = []
+enricher = TitleEnricher()
+torrent_metadata = TorrentMetadata(
+    os.path.join(BOT_CONFIG_DIR, "torrents"), max_bytes=METADATA_MAX_BYTES, concurrency=METADATA_CONCURRENCY
+)
+seeder_refresher = SeederRefresher(deadline=SCRAPE_DEADLINE, ttl=SCRAPE_TTL) if LIVE_SCRAPE else None
+cookie_manager = CookieManager(
+    os.path.join(BOT_CONFIG_DIR, "cookies.json"),
+    jackett,
+    FLARESOLVERR_URL,
+    margin=COOKIE_REFRESH_MARGIN,
+    default_ttl=COOKIE_DEFAULT_TTL,
+    indexers=COOKIE_INDEXERS,
+) if FLARESOLVERR_URL else None
+result_index = ResultIndex(
+    os.path.join(BOT_CONFIG_DIR, "results.db"), max_rows=INDEX_MAX_ROWS, max_age_days=INDEX_MAX_AGE_DAYS
+)
 
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    await update.message.reply_text("Welcome to Jackett Search Bot!\nUse /search <query> to search.")
+    await update.message.reply_text(START_TEXT)
 
 
-def format_result(result):
-    title = result.get("Title")
-    size = result.get("Size", 0)
+def format_size(size):
     size_mb = size / (1024 * 1024)
-    size_str = f"{size_mb:.2f} MB" if size_mb < 1024 else f"{size_mb / 1024:.2f} GB"
+    return f"{size_mb:.2f} MB" if size_mb < 1024 else f"{size_mb / 1024:.2f} GB"
+
+
+def format_result(result):
+    title = escape_markdown(result.get("Title") or "")
+    size_str = format_size(result.get("Size") or 0)
     seeders = result.get("Seeders", 0)
+    if result.get("SeedersLive"):
+        seeders = f"{seeders} (live)"
     link = result.get("MagnetUri") or result.get("Link")
+    tags = describe(result["Attrs"]) if result.get("Attrs") else ""
+    tag_line = f"🏷 {tags}\n" if tags else ""
     return (
         f"🎬 *{title}*\n"
+        f"{tag_line}"
         f"📦 Size: {size_str}\n"
         f"🌱 Seeders: {seeders}\n"
         f"🔗 [Magnet/Link]({link})"
     )
 
 
+def start_search(query):
+    """Run for a canonical query, shared by every caller until it finishes."""
+    results = result_cache.get(query.key)
+    if results is not None:
+        return SearchRun.completed(results)
+    run = active_runs.get(query.key)
+    if run is not None:
+        return run
+
+    indexers = jackett_indexers or [("all", "Jackett")]
+    fetchers = {
+        indexer: (
+            name,
+            lambda indexer=indexer: jackett.search_canonical(query, indexer, timeout=JACKETT_LATE_TIMEOUT),
+        )
+        for indexer, name in indexers
+    }
+    run = SearchRun(fetchers, indexer_stats, enricher.enrich).start()
+    active_runs[query.key] = run
+    asyncio.get_running_loop().call_later(JOB_BUDGET, run.cancel)
+    asyncio.create_task(finish_search(query.key, run))
+    return run
+
+
+async def finish_search(key, run):
+    try:
+        results = await run.result()
+        result_cache.put(key, results)
+        await asyncio.to_thread(result_index.ingest, results)
+    except SearchFailed as e:
+        logger.error(f"Search failed on every indexer: {e}")
+    except sqlite3.Error as e:
+        logger.warning(f"Could not index results: {e}")
+    finally:
+        active_runs.pop(key, None)
+
+
+async def cached_search(query):
+    return await start_search(query).result()
+
+
+def run_note(run):
+    notes = []
+    if run.pending:
+        notes.append(f"⏳ Partial results, still waiting on: {', '.join(run.pending_names)}")
+    if run.failed:
+        notes.append(f"⚠️ Failed: {', '.join(run.failed_names)}")
+    return escape_markdown("\n".join(notes)) if notes else None
+
+
 async def search(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     query = " ".join(context.args)
-    if not query:
+    canonical = canonicalize(query)
+    if not canonical.text:
         await update.message.reply_text("Usage: /search <query>")
         return
 
-    api_url = f"{JACKETT_API_URL}/api/v2.0/indexers/all/results"
-    params = {
-        "apikey": JACKETT_API_KEY,
-        "Query": query,
-        "Limit": 50,
-        "SortBy": "seeders",
-        "SortDirection": "desc",
-    }
+    query_popularity.hit(canonical.key)
+    seq = context.user_data["search_seq"] = context.user_data.get("search_seq", 0) + 1
+    cached = result_cache.get(canonical.key)
+    if cached is not None:
+        set_results(context.user_data, list(cached))
+        await show_result_page(update, context)
+        return
+
+    indexed = enricher.enrich(result_index.search(canonical.display))
+    if indexed:
+        set_results(context.user_data, indexed, INDEX_PREVIEW_NOTE)
+        placeholder = await show_result_page(update, context)
+    else:
+        placeholder = await update.message.reply_text(f"🔎 Searching for '{query}'…")
+    search_jobs.submit(canonical.key, (canonical, placeholder, context.user_data, indexed, seq))
+
+
+def parse_bulk(text):
+    """Export format and distinct canonical queries of a /bulk message."""
+    fmt = "csv"
+    words = text.split(None, 1)
+    if words and words[0].lower() in ("csv", "json"):
+        fmt = words[0].lower()
+        text = words[1] if len(words) > 1 else ""
+    queries = {}
+    for line in text.replace(";", "\n").splitlines():
+        canonical = canonicalize(line)
+        if canonical.display and canonical.key not in queries:
+            queries[canonical.key] = canonical
+    return fmt, list(queries.values())
+
+
+async def bulk(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    fmt, queries = parse_bulk("".join(update.message.text.split(None, 1)[1:]))
+    if not queries:
+        await update.message.reply_text(
+            "Usage: /bulk [csv|json] <queries, one per line or separated by ;>"
+        )
+        return
+    if len(queries) > BULK_MAX_QUERIES:
+        await update.message.reply_text(f"You can search at most {BULK_MAX_QUERIES} queries at once.")
+        return
+
+    status = await update.message.reply_text(f"🔎 Searching {len(queries)} queries…")
+    export = ResultExport(fmt)
+    semaphore = asyncio.Semaphore(BULK_CONCURRENCY)
+    failed = []
+
+    async def run_one(canonical):
+        async with semaphore:
+            try:
+                with admission:
+                    results = await cached_search(canonical)
+            except Exception as e:
+                logger.warning(f"Bulk search for '{canonical.display}' failed: {e}")
+                failed.append(canonical.display)
+                return
+        export.write(canonical.display, results)
 
     try:
-        response = requests.get(api_url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        results = data.get("Results", [])
-        if not results:
-            await update.message.reply_text("No results found.")
+        await asyncio.gather(*(run_one(canonical) for canonical in queries))
+        path = export.finish()
+        caption = f"{export.rows} results for {len(queries) - len(failed)} of {len(queries)} queries"
+        if failed:
+            caption += f"\n⚠️ Failed: {', '.join(failed)}"
+        with open(path, "rb") as file:
+            await update.message.reply_document(file, filename=f"search_results.{fmt}", caption=caption[:1024])
+        await status.delete()
+    except Exception as e:
+        logger.error(f"Bulk export failed: {e}")
+        await status.edit_text(f"Error: {e}")
+    finally:
+        export.discard()
+
+
+async def execute_search(job):
+    """Worker side of a search job: wait for the adaptive deadline, not for every indexer."""
+    canonical = job.subscribers[0][0]
+    with admission:
+        run = start_search(canonical)
+        deadline = indexer_stats.deadline(run.indexers, SEARCH_MIN_DEADLINE, SEARCH_MAX_DEADLINE)
+        await run.wait(deadline)
+        if run.finished.is_set():
+            await run.result()
+        results = list(run.results)
+        if seeder_refresher is not None:
+            try:
+                await seeder_refresher.refresh(results)
+            except Exception as e:
+                logger.warning(f"Live seeder refresh failed: {e}")
+    return run, results
+
+
+async def publish_results(message, user_data, seq, results, note=None, run=None):
+    """Show results on a search's placeholder, storing them only for the user's latest search.
+
+    A search that was superseded while it ran only gets a first page without
+    buttons, so the user's newer results stay the ones Prev/Next operate on.
+    """
+    if user_data.get("search_seq") != seq:
+        reply_text, _ = render_page({"search_view": ResultView(results), "search_note": note})
+        await message.edit_text(reply_text, parse_mode="Markdown", disable_web_page_preview=True)
+        return False
+    set_results(user_data, results, note)
+    if run is not None:
+        user_data["search_run"] = run
+    await edit_result_page(message, user_data)
+    return True
+
+
+async def deliver_search(subscriber, outcome):
+    canonical, message, user_data, indexed, seq = subscriber
+    if isinstance(outcome, Exception):
+        logger.error(f"Search error for '{canonical.display}': {outcome}")
+        if not indexed:
+            await message.edit_text(f"Error: {outcome}")
             return
+        await publish_results(message, user_data, seq, indexed, INDEX_FALLBACK_NOTE)
+        return
 
-        context.user_data["search_results"] = results
-        context.user_data["search_pos"] = 0
-        await show_result_page(update, context)
+    run, results = outcome
+    if not results and run.finished.is_set():
+        await message.edit_text("No results found.")
+        return
+
+    if not results and indexed:
+        note = "\n".join(n for n in (INDEX_PREVIEW_NOTE, run_note(run)) if n)
+        published = await publish_results(message, user_data, seq, indexed, note, run)
+        if published:
+            user_data["search_preview"] = True
+    else:
+        published = await publish_results(message, user_data, seq, results, run_note(run), run)
+    if published and not run.finished.is_set():
+        asyncio.create_task(deliver_late_results(run, message, user_data))
+
+
+async def deliver_late_results(run, message, user_data):
+    """Edit a partial result message as the remaining indexers answer."""
+    loop = asyncio.get_running_loop()
+    last_edit = loop.time()
+    async for _ in run.changes():
+        if not run.finished.is_set() and loop.time() - last_edit < LATE_EDIT_INTERVAL:
+            continue
+        if not await merge_late_results(run, message, user_data):
+            return
+        last_edit = loop.time()
+    await merge_late_results(run, message, user_data)
+
+
+async def merge_late_results(run, message, user_data):
+    """Fold newly arrived results into the stored view.
+
+    An index preview stays up until the first live results replace it, and
+    comes back as the fallback if the run ends without any.
+    """
+    view = user_data.get("search_view")
+    if view is None or user_data.get("search_run") is not run:
+        return False
+    note = run_note(run)
+    if user_data.get("search_preview"):
+        if run.results:
+            user_data.pop("search_preview")
+            user_data["search_view"] = ResultView(run.results)
+            user_data["search_pos"] = 0
+        elif run.finished.is_set():
+            try:
+                await run.result()
+            except SearchFailed:
+                note = INDEX_FALLBACK_NOTE
+        else:
+            note = "\n".join(n for n in (INDEX_PREVIEW_NOTE, note) if n)
+    else:
+        new_results = run.results[len(view.results):]
+        if not new_results and note == user_data.get("search_note"):
+            return True
+        user_data["search_view"] = view.extend(new_results)
+    user_data["search_note"] = note
+    try:
+        await edit_result_page(message, user_data)
     except Exception as e:
-        logger.error(f"Search error: {e}")
-        await update.message.reply_text(f"Error: {e}")
+        logger.warning(f"Could not update partial results: {e}")
+    return True
+
+
+def set_results(user_data, results, note=None):
+    user_data.pop("search_run", None)
+    user_data.pop("search_preview", None)
+    user_data["search_view"] = ResultView(results)
+    user_data["search_pos"] = 0
+    user_data["search_note"] = note
+
+
+def facet_keyboard(view):
+    sort_row = [
+        InlineKeyboardButton(("✅ " if view.sort == sort else "") + label, callback_data=f"facet_sort:{sort}")
+        for sort, label in SORTS.items()
+    ]
+    filter_row = [
+        InlineKeyboardButton(
+            f"{facet.capitalize()}: {view.filters[facet] or 'any'}", callback_data=f"facet_cycle:{facet}"
+        )
+        for facet in FACETS
+        if len(view.options(facet)) > 1 or view.filters[facet] is not None
+    ]
+    return [sort_row, filter_row] if filter_row else [sort_row]
 
 
-async def show_result_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    results = context.user_data.get("search_results", [])
-    pos = context.user_data.get("search_pos", 0)
+def shorten(text, limit):
+    """``text`` cut to ``limit`` characters, keeping its end (the file name)."""
+    return text if len(text) <= limit else "…" + text[-(limit - 1):]
+
+
+def result_token(result):
+    """Short id of a result for callback data, stable across searches."""
+    return hashlib.sha1(infohash(result).encode()).hexdigest()[:16]
+
+
+def render_page(user_data):
+    view = user_data.get("search_view") or ResultView([])
+    results = view.items()
+    pos = user_data.get("search_pos", 0)
     page_results = results[pos:pos + RESULTS_PER_PAGE]
 
     buttons = []
@@ -89,8 +445,33 @@ async def show_result_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if pos + RESULTS_PER_PAGE < len(results):
         buttons.append(InlineKeyboardButton("Next ➡️", callback_data="page_next"))
 
-    reply_markup = InlineKeyboardMarkup([buttons]) if buttons else None
-    reply_text = "\n\n".join(format_result(r) for r in page_results)
+    file_buttons = [
+        InlineKeyboardButton(f"📂 Files #{pos + i + 1}", callback_data=f"files:{result_token(r)}")
+        for i, r in enumerate(page_results)
+        if (r.get("Link") or "").startswith(("http://", "https://"))
+    ]
+    rows = [row for row in (file_buttons, buttons) if row]
+    if view.results:
+        rows.extend(facet_keyboard(view))
+    reply_markup = InlineKeyboardMarkup(rows) if rows else None
+    reply_text = "\n\n".join(f"#{pos + i + 1} " + format_result(r) for i, r in enumerate(page_results))
+    if not reply_text:
+        reply_text = "No results match these filters." if view.results else "No results yet."
+    note = user_data.get("search_note")
+    if note:
+        reply_text = f"_{note}_\n\n{reply_text}"
+    return reply_text, reply_markup
+
+
+async def edit_result_page(message, user_data):
+    reply_text, reply_markup = render_page(user_data)
+    return await message.edit_text(
+        reply_text, parse_mode="Markdown", disable_web_page_preview=True, reply_markup=reply_markup
+    )
+
+
+async def show_result_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    reply_text, reply_markup = render_page(context.user_data)
 
     if update.callback_query:
         await update.callback_query.edit_message_text(
@@ -98,68 +479,431 @@ async def show_result_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         await update.callback_query.answer()
     else:
-        await update.message.reply_text(
+        return await update.message.reply_text(
             reply_text, parse_mode="Markdown", disable_web_page_preview=True, reply_markup=reply_markup
         )
 
 
+def turn_page(user_data, data):
+    pos = user_data.get("search_pos", 0)
+    if data == "page_next":
+        user_data["search_pos"] = pos + RESULTS_PER_PAGE
+    elif data == "page_prev":
+        user_data["search_pos"] = max(0, pos - RESULTS_PER_PAGE)
+
+
+def change_facet(user_data, data):
+    view = user_data["search_view"]
+    action, _, value = data.partition(":")
+    if action == "facet_sort":
+        view.set_sort(value)
+    elif action == "facet_cycle" and value in FACETS:
+        view.cycle(value)
+    user_data["search_pos"] = 0
+
+
 async def paginate(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    pos = context.user_data.get("search_pos", 0)
-    if query.data == "page_next":
-        context.user_data["search_pos"] = pos + RESULTS_PER_PAGE
-    elif query.data == "page_prev":
-        context.user_data["search_pos"] = max(0, pos - RESULTS_PER_PAGE)
+    if context.user_data.get("search_view") is None:
+        await query.answer(EXPIRED_MESSAGE)
+        return
+
+    turn_page(context.user_data, query.data)
     await show_result_page(update, context)
 
 
+async def apply_facet(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    if context.user_data.get("search_view") is None:
+        await query.answer(EXPIRED_MESSAGE)
+        return
+
+    change_facet(context.user_data, query.data)
+    await show_result_page(update, context)
+
+
+async def show_files(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    view = context.user_data.get("search_view")
+    token = query.data.partition(":")[2]
+    result = next((r for r in view.results if result_token(r) == token), None) if view else None
+    if result is None:
+        await query.answer(EXPIRED_MESSAGE)
+        return
+
+    await query.answer("Fetching file list…")
+    try:
+        meta = await torrent_metadata.get(result)
+    except MetadataUnavailable as e:
+        await query.message.reply_text(f"No file list available: {e}")
+        return
+    except Exception as e:
+        logger.error(f"Metadata fetch error: {e}")
+        await query.message.reply_text("Could not fetch the torrent file.")
+        return
+
+    files = sorted(meta["files"], key=lambda f: f[1], reverse=True)
+    text = (
+        f"📂 *{escape_markdown(shorten(meta['name'], FILE_PATH_MAX))}*\n"
+        f"{len(files)} files, {format_size(meta['total'])} total\n"
+    )
+    shown = 0
+    for path, length in files[:FILE_LIST_LIMIT]:
+        line = f"\n• {escape_markdown(shorten(path, FILE_PATH_MAX))} ({format_size(length)})"
+        if len(text) + len(line) > MESSAGE_MAX - 40:
+            break
+        text += line
+        shown += 1
+    if shown < len(files):
+        text += f"\n…and {len(files) - shown} more files"
+    try:
+        await query.message.reply_text(text, parse_mode="Markdown")
+    except Exception as e:
+        logger.error(f"Could not send file list: {e}")
+
+
+async def watch(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    query = " ".join(context.args)
+    if not canonicalize(query).text:
+        await update.message.reply_text("Usage: /watch <query>")
+        return
+
+    chat_id = update.effective_chat.id
+    if len(watch_store.for_chat(chat_id)) >= WATCH_MAX_PER_CHAT:
+        await update.message.reply_text(f"You can watch at most {WATCH_MAX_PER_CHAT} queries.")
+        return
+    if watch_store.add(chat_id, query):
+        await update.message.reply_text(f"Watching '{query}'. You'll be notified about new releases.")
+    else:
+        await update.message.reply_text(f"Already watching '{query}'.")
+
+
+async def unwatch(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    query = " ".join(context.args)
+    if not query:
+        await update.message.reply_text("Usage: /unwatch <query>")
+        return
+
+    if watch_store.remove(update.effective_chat.id, query):
+        await update.message.reply_text(f"Stopped watching '{query}'.")
+    else:
+        await update.message.reply_text(f"Not watching '{query}'.")
+
+
+async def watches(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    subs = watch_store.for_chat(update.effective_chat.id)
+    if not subs:
+        await update.message.reply_text("No watched queries. Use /watch <query> to add one.")
+        return
+    await update.message.reply_text("Watched queries:\n" + "\n".join(f"• {sub.query}" for sub in subs))
+
+
+async def notify_watch(bot: Bot, sub, results):
+    text = "\n\n".join(format_result(r) for r in results[:WATCH_NOTIFY_LIMIT])
+    if len(results) > WATCH_NOTIFY_LIMIT:
+        text += f"\n\n…and {len(results) - WATCH_NOTIFY_LIMIT} more."
+    await bot.send_message(
+        sub.chat_id,
+        f"🔔 New releases for *{escape_markdown(sub.query)}*:\n\n{text}",
+        parse_mode="Markdown",
+        disable_web_page_preview=True,
+    )
+
+
 async def info(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     await update.message.reply_text(f"Jackett URL:\n`{JACKETT_API_URL}`", parse_mode="Markdown")
 
 
 async def stop(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    if update.effective_user is None or update.effective_user.id not in ADMIN_USER_IDS:
+        await update.message.reply_text("Only the bot admin can stop the bot.")
+        return
     await update.message.reply_text("Bot stopping...")
-    await context.application.shutdown()
+    # Let aiohttp's SIGTERM handling run on_cleanup, which stops the application.
+    os.kill(os.getpid(), signal.SIGTERM)
 
 
 async def health_check(request):
     return web.Response(text="OK", status=200)
 
 
+async def refresh_indexers_periodically():
+    global jackett_indexers
+    while True:
+        try:
+            jackett_indexers = await jackett.indexers()
+            logger.info(f"Searching {len(jackett_indexers)} configured indexers")
+        except Exception as e:
+            logger.error(f"Could not list Jackett indexers: {e}")
+        await asyncio.sleep(INDEXER_REFRESH_INTERVAL)
+
+
+async def compact_index_periodically():
+    while True:
+        await asyncio.sleep(INDEX_COMPACT_INTERVAL)
+        try:
+            await asyncio.to_thread(result_index.compact)
+        except Exception as e:
+            logger.error(f"Index compaction failed: {e}")
+
+
+def restore_warm_state():
+    """Reload the state saved by the last shutdown.
+
+    Latency stats and popularity are small and needed right away; the result
+    cache and enrichment memo are only decompressed from the mapped file the
+    first time they are used.
+    """
+    snapshot = Snapshot(SNAPSHOT_PATH)
+    indexer_stats.load(snapshot.section("indexer_stats"))
+    query_popularity.load(snapshot.section("popularity"))
+    result_cache.restore_lazily(lambda: snapshot.section("result_cache"))
+    enricher.restore_lazily(lambda: snapshot.section("enrich_memo"))
+    if snapshot.toc:
+        logger.info(f"Restored warm state from {SNAPSHOT_PATH}")
+    return snapshot
+
+
+def save_warm_state(snapshot):
+    sections = {
+        "indexer_stats": indexer_stats.dump(),
+        "popularity": query_popularity.dump(),
+        "result_cache": result_cache.dump(),
+        "enrich_memo": enricher.dump(),
+    }
+    snapshot.close()
+    size = write_snapshot(SNAPSHOT_PATH, sections)
+    logger.info(f"Saved warm state to {SNAPSHOT_PATH} ({size} bytes)")
+
+
+async def snapshot_periodically(snapshot):
+    """Save warm state now and then, so a hard kill loses at most one interval."""
+    while True:
+        await asyncio.sleep(SNAPSHOT_INTERVAL)
+        try:
+            save_warm_state(snapshot)
+        except Exception as e:
+            logger.error(f"Could not save warm state: {e}")
+
+
+async def warm_popular_queries():
+    """Re-run the most requested queries in the background after a restart."""
+    await asyncio.sleep(WARM_DELAY)
+    for key in query_popularity.top(WARM_QUERIES):
+        if result_cache.get(key) is not None:
+            continue
+        try:
+            await cached_search(CanonicalQuery.from_key(key))
+        except Exception as e:
+            logger.warning(f"Warming {key} failed: {e}")
+
+
+def command_name(bot: Bot, text):
+    """Command a message invokes, or None if it is no command or is meant for another bot."""
+    if not text or not text.startswith("/"):
+        return None
+    command, _, target = text.split(None, 1)[0].partition("@")
+    if target and target.lower() != (bot.username or "").lower():
+        return None
+    return command
+
+
+def expensive_query(bot: Bot, update: Update):
+    """Query text of an update that would hit Jackett, or None for cheap updates."""
+    message = update.message
+    if not message or command_name(bot, message.text) not in EXPENSIVE_COMMANDS:
+        return None
+    query = "".join(message.text.split(None, 1)[1:])
+    canonical = canonicalize(query)
+    if result_cache.get(canonical.key) is not None or canonical.key in search_jobs.jobs:
+        return None
+    return query
+
+
+async def track_queue_delay(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    admission.dispatched(update.update_id)
+
+
+async def accept_update(app: web.Application, update: Update, inline=False):
+    """Entry point for updates from both the webhook and long polling.
+
+    A shed update gets a busy reply; with ``inline`` it is returned as a Bot
+    API call for the webhook response instead of being sent.
+    """
+    dispatcher = app["dispatcher"]
+    if expensive_query(app["bot"], update) and not admission.admit(dispatcher.backlog, search_jobs.queue.qsize()):
+        chat_id = update.effective_chat.id
+        logger.warning(f"Shedding search from chat {chat_id}: overloaded")
+        if inline:
+            return {"method": "sendMessage", "chat_id": chat_id, "text": BUSY_MESSAGE}
+        try:
+            await app["bot"].send_message(chat_id, BUSY_MESSAGE)
+        except Exception as e:
+            logger.error(f"Could not tell chat {chat_id} the bot is busy: {e}")
+        return None
+    admission.received(update.update_id)
+    dispatcher.submit(update)
+    return None
+
+
+def inline_reply(app: web.Application, update: Update):
+    """Bot API call answering ``update`` from memory, for the webhook response body.
+
+    Only updates whose reply needs no I/O qualify, and only while nothing else
+    from the same chat is in flight, so replies never overtake earlier updates.
+    Returns None when the update has to go through the dispatcher.
+    """
+    if app["dispatcher"].busy(update):
+        return None
+    message = update.message
+    if message and message.text:
+        command = command_name(app["bot"], message.text)
+        if command == "/start":
+            return {"method": "sendMessage", "chat_id": message.chat_id, "text": START_TEXT}
+        if command == "/info":
+            return {
+                "method": "sendMessage",
+                "chat_id": message.chat_id,
+                "text": f"Jackett URL:\n`{JACKETT_API_URL}`",
+                "parse_mode": "Markdown",
+            }
+        return None
+
+    query = update.callback_query
+    if not query or not query.message or not (query.data or "").startswith(("page_", "facet_")):
+        return None
+    user_data = app["app"].user_data.get(query.from_user.id)
+    if not user_data or user_data.get("search_view") is None:
+        return {"method": "answerCallbackQuery", "callback_query_id": query.id, "text": EXPIRED_MESSAGE}
+    if query.data.startswith("page_"):
+        turn_page(user_data, query.data)
+    else:
+        change_facet(user_data, query.data)
+    reply_text, reply_markup = render_page(user_data)
+    asyncio.create_task(answer_callback(app["bot"], query.id))
+    reply = {
+        "method": "editMessageText",
+        "chat_id": query.message.chat_id,
+        "message_id": query.message.message_id,
+        "text": reply_text,
+        "parse_mode": "Markdown",
+        "disable_web_page_preview": True,
+    }
+    if reply_markup is not None:
+        reply["reply_markup"] = reply_markup.to_dict()
+    return reply
+
+
+async def answer_callback(bot: Bot, callback_query_id):
+    try:
+        await bot.answer_callback_query(callback_query_id)
+    except Exception as e:
+        logger.warning(f"Could not answer callback query: {e}")
+
+
 async def handle_webhook(request: web.Request) -> web.Response:
-    bot = request.app["bot"]
-    application = request.app["app"]
     data = await request.json()
-    update = Update.de_json(data, bot)
-    await application.update_queue.put(update)
+    update = Update.de_json(data, request.app["bot"])
+    reply = inline_reply(request.app, update)
+    if reply is None:
+        reply = await accept_update(request.app, update, inline=True)
+    if reply is not None:
+        return web.json_response(reply)
     return web.Response(text="ok")
 
 
 async def on_startup(app: web.Application):
     bot = app["bot"]
-    await bot.set_webhook(WEBHOOK_URL)
+    application = app["app"]
+    app["snapshot"] = restore_warm_state()
+    await application.initialize()
+    await application.start()
+    app["dispatcher"] = UpdateDispatcher(application, UPDATE_CONCURRENCY)
+    search_jobs.start()
+    if BOT_MODE == "webhook":
+        await bot.set_webhook(WEBHOOK_URL)
+    else:
+        await bot.delete_webhook()
+        app["poll_task"] = asyncio.create_task(
+            poll_updates(
+                bot,
+                lambda update: accept_update(app, update),
+                os.path.join(BOT_CONFIG_DIR, "update_offset"),
+                limit=POLL_LIMIT,
+                timeout=POLL_TIMEOUT,
+            )
+        )
+
+    scheduler = WatchScheduler(
+        watch_store,
+        lambda query: cached_search(canonicalize(query)),
+        lambda sub, results: notify_watch(bot, sub, results),
+        interval=WATCH_INTERVAL,
+    )
+    app["watch_task"] = asyncio.create_task(scheduler.run())
+    app["compact_task"] = asyncio.create_task(compact_index_periodically())
+    app["indexers_task"] = asyncio.create_task(refresh_indexers_periodically())
+    app["warm_task"] = asyncio.create_task(warm_popular_queries())
+    app["snapshot_task"] = asyncio.create_task(snapshot_periodically(app["snapshot"]))
+    if cookie_manager is not None:
+        app["cookie_task"] = asyncio.create_task(cookie_manager.run())
 
 
 async def on_cleanup(app: web.Application):
     bot = app["bot"]
-    await bot.delete_webhook()
+    application = app["app"]
+    app["watch_task"].cancel()
+    app["compact_task"].cancel()
+    app["indexers_task"].cancel()
+    app["warm_task"].cancel()
+    app["snapshot_task"].cancel()
+    try:
+        save_warm_state(app["snapshot"])
+    except Exception as e:
+        logger.error(f"Could not save warm state: {e}")
+    if cookie_manager is not None:
+        app["cookie_task"].cancel()
+        await cookie_manager.close()
+    search_jobs.stop()
+    if BOT_MODE == "webhook":
+        await bot.delete_webhook()
+    else:
+        app["poll_task"].cancel()
+    if application.running:
+        await application.stop()
+    await application.shutdown()
+    await jackett.close()
+    await torrent_metadata.close()
+    result_index.close()
 
 
 def main():
-    bot = Bot(token=TELEGRAM_BOT_TOKEN)
+    bot = Bot(
+        token=TELEGRAM_BOT_TOKEN,
+        request=HTTPXRequest(connection_pool_size=UPDATE_CONCURRENCY),
+        get_updates_request=HTTPXRequest(read_timeout=POLL_TIMEOUT + 10),
+    )
     application = Application.builder().bot(bot).build()
 
     application.add_handler(CommandHandler("start", start))
+    application.add_handler(TypeHandler(Update, track_queue_delay), group=-1)
     application.add_handler(CommandHandler("search", search))
+    application.add_handler(CommandHandler("bulk", bulk, block=False))
+    application.add_handler(CommandHandler("watch", watch))
+    application.add_handler(CommandHandler("unwatch", unwatch))
+    application.add_handler(CommandHandler("watches", watches))
     application.add_handler(CommandHandler("info", info))
     application.add_handler(CommandHandler("stop", stop))
     application.add_handler(CallbackQueryHandler(paginate, pattern="page_.*"))
+    application.add_handler(CallbackQueryHandler(apply_facet, pattern="facet_.*"))
+    application.add_handler(CallbackQueryHandler(show_files, pattern=r"files:[0-9a-f]+", block=False))
 
     app = web.Application()
     app["bot"] = bot
     app["app"] = application
 
-    app.router.add_post(f"/{TELEGRAM_BOT_TOKEN}", handle_webhook)
+    if BOT_MODE == "webhook":
+        app.router.add_post(f"/{TELEGRAM_BOT_TOKEN}", handle_webhook)
     app.router.add_get("/ping", health_check)
 
     app.on_startup.append(on_startup)
@@ -0,0 +1,85 @@
+import math
+import time
+from collections import OrderedDict
+
+
+class ResultCache:
+    """LRU cache of search results with a per-entry time to live."""
+
+    def __init__(self, ttl=600, max_entries=500):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._restore = None
+
+    def _hydrate(self):
+        """Merge entries from a pending snapshot loader on first use."""
+        loader, self._restore = self._restore, None
+        entries = loader() or []
+        now = time.time()
+        restored = OrderedDict(
+            (key, (stored_at, results)) for key, stored_at, results in entries if now - stored_at <= self.ttl
+        )
+        restored.update(self._entries)
+        self._entries = restored
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def restore_lazily(self, loader):
+        self._restore = loader
+
+    def dump(self):
+        if self._restore is not None:
+            self._hydrate()
+        return [[key, stored_at, results] for key, (stored_at, results) in self._entries.items()]
+
+    def get(self, key):
+        if self._restore is not None:
+            self._hydrate()
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, results = entry
+        if time.time() - stored_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return results
+
+    def put(self, key, results):
+        if self._restore is not None:
+            self._hydrate()
+        self._entries[key] = (time.time(), results)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class QueryPopularity:
+    """Exponentially decayed request counts per canonical query key."""
+
+    def __init__(self, half_life=7 * 86400, max_entries=2000):
+        self.decay = math.log(2) / half_life
+        self.max_entries = max_entries
+        self.scores = {}
+
+    def _score(self, key, now):
+        score, seen = self.scores.get(key, (0.0, now))
+        return score * math.exp(-self.decay * (now - seen))
+
+    def hit(self, key):
+        now = time.time()
+        self.scores[key] = (self._score(key, now) + 1, now)
+        if len(self.scores) > self.max_entries:
+            coldest = min(self.scores, key=lambda k: self._score(k, now))
+            del self.scores[coldest]
+
+    def top(self, n):
+        now = time.time()
+        return sorted(self.scores, key=lambda k: self._score(k, now), reverse=True)[:n]
+
+    def dump(self):
+        return self.scores
+
+    def load(self, state):
+        self.scores.update({key: tuple(value) for key, value in (state or {}).items()})
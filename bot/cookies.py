@@ -0,0 +1,164 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from storage import atomic_write
+
+logger = logging.getLogger(__name__)
+
+CHALLENGE_RE = re.compile(r"cloudflare|flaresolverr|challenge|ddos-guard|captcha", re.I)
+
+
+def _field(fields, field_id):
+    for field in fields:
+        if field.get("id") == field_id:
+            return field
+    return None
+
+
+class CookieManager:
+    """Keeps challenge cookies of cookie-based indexers fresh ahead of expiry.
+
+    Only indexers listed in ``indexers``, or whose last error was a failed
+    challenge, are managed, and only if their config exposes both a ``cookie``
+    and a ``useragent`` setting: a clearance cookie is bound to the user agent
+    that solved it. Jackett's own session (``cookieheader``) is never touched.
+    Cookies are solved once per site through FlareSolverr and pushed into the
+    config of every managed indexer on that site. Expiry times are persisted
+    under /bot_config, so a restart resumes the schedule instead of re-solving.
+    """
+
+    def __init__(self, path, jackett, flaresolverr_url, margin=600, default_ttl=1800, tick=60, timeout=60,
+                 retry_after=300, indexers=None):
+        self.path = path
+        self.jackett = jackett
+        self.flaresolverr_url = flaresolverr_url.rstrip("/")
+        self.margin = margin
+        self.default_ttl = default_ttl
+        self.tick = tick
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.only = set(indexers) if indexers else None
+        self.sites = {}
+        self.indexers = {}
+        self._session = None
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as file:
+                data = json.load(file)
+            self.sites = data.get("sites", {})
+            self.indexers = data.get("indexers", {})
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not load cookies from {self.path}: {e}")
+
+    def save(self):
+        with atomic_write(self.path) as file:
+            json.dump({"sites": self.sites, "indexers": self.indexers}, file)
+
+    def _wanted(self, indexer, fields):
+        if self.only is not None:
+            return indexer in self.only
+        if indexer in self.indexers:
+            return True
+        last_error = _field(fields, "lasterror")
+        return bool(last_error and CHALLENGE_RE.search(last_error.get("value") or ""))
+
+    async def discover(self):
+        """Find configured indexers whose challenge cookie this manager can keep fresh."""
+        managed = {}
+        for indexer, _ in await self.jackett.indexers():
+            try:
+                fields = await self.jackett.indexer_config(indexer)
+            except Exception as e:
+                logger.warning(f"Could not read config of {indexer}: {e}")
+                continue
+            if not self._wanted(indexer, fields):
+                continue
+            site_link = _field(fields, "sitelink")
+            if _field(fields, "cookie") is None or _field(fields, "useragent") is None:
+                logger.warning(f"Not managing cookies of {indexer}: it has no cookie and user agent settings")
+                continue
+            if site_link is None or not site_link.get("value"):
+                continue
+            site = urlsplit(site_link["value"]).hostname
+            managed[indexer] = site
+            self.sites.setdefault(site, {"url": site_link["value"], "cookie": None, "expires": 0})
+        self.indexers = managed
+        self.sites = {site: entry for site, entry in self.sites.items() if site in managed.values()}
+        self.save()
+
+    def due(self, now=None):
+        now = now or time.time()
+        return [
+            site
+            for site, entry in self.sites.items()
+            if entry["expires"] - now < self.margin and entry.get("retry_at", 0) <= now
+        ]
+
+    async def solve(self, url):
+        """Cookie header, user agent and expiry from a FlareSolverr challenge solve."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(raise_for_status=True)
+        payload = {"cmd": "request.get", "url": url, "maxTimeout": self.timeout * 1000}
+        timeout = aiohttp.ClientTimeout(total=self.timeout + 10)
+        async with self._session.post(f"{self.flaresolverr_url}/v1", json=payload, timeout=timeout) as response:
+            data = await response.json(content_type=None)
+        if data.get("status") != "ok":
+            raise RuntimeError(data.get("message") or "FlareSolverr could not solve the challenge")
+        solution = data["solution"]
+        cookies = solution.get("cookies", [])
+        header = "; ".join(f"{c['name']}={c['value']}" for c in cookies)
+        if not solution.get("userAgent"):
+            raise RuntimeError("FlareSolverr returned no user agent for the solved cookies")
+        expiries = [c["expires"] for c in cookies if c.get("expires", -1) > 0]
+        expires = min(expiries) if expiries else time.time() + self.default_ttl
+        return header, solution.get("userAgent"), expires
+
+    async def refresh(self, site):
+        entry = self.sites[site]
+        header, user_agent, expires = await self.solve(entry["url"])
+        for indexer, indexer_site in self.indexers.items():
+            if indexer_site != site:
+                continue
+            fields = await self.jackett.indexer_config(indexer)
+            _field(fields, "cookie")["value"] = header
+            _field(fields, "useragent")["value"] = user_agent
+            await self.jackett.set_indexer_config(indexer, fields)
+        entry.update({
+            "cookie": header, "user_agent": user_agent, "expires": expires, "refreshed": time.time(), "retry_at": 0,
+        })
+        self.save()
+        logger.info(f"Refreshed challenge cookie for {site}, valid for {int(expires - time.time())}s")
+
+    async def run(self, rediscover_every=3600):
+        last_discovery = 0
+        while True:
+            now = time.time()
+            if now - last_discovery > rediscover_every:
+                try:
+                    await self.discover()
+                    last_discovery = now
+                except Exception as e:
+                    logger.error(f"Cookie indexer discovery failed: {e}")
+            for site in self.due(now):
+                try:
+                    await self.refresh(site)
+                except Exception as e:
+                    logger.warning(f"Cookie refresh for {site} failed: {e}")
+                    self.sites[site]["retry_at"] = now + self.retry_after
+                    self.save()
+            await asyncio.sleep(self.tick)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
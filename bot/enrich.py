@@ -0,0 +1,136 @@
+import re
+from collections import OrderedDict
+
+RESOLUTION_RE = re.compile(r"\b(2160p|4k|uhd|1080[pi]|720p|576p|480p)\b", re.I)
+CODEC_RE = re.compile(r"\b(x\.?265|h\.?265|hevc|x\.?264|h\.?264|avc|av1|xvid|divx)\b", re.I)
+SOURCE_RE = re.compile(
+    r"\b(remux|blu-?ray|bd-?rip|br-?rip|web-?dl|web-?rip|web|hdtv|dvd-?rip|dvd|hd-?cam|cam|telesync|hdts)\b", re.I
+)
+EPISODE_RE = re.compile(r"\bs(\d{1,2})[ .]?e(\d{1,3})(?:-?e?(\d{1,3}))?\b|\b(\d{1,2})x(\d{2,3})\b", re.I)
+SEASON_RE = re.compile(r"\bs(\d{1,2})(?:\s?-\s?s?(\d{1,2}))?\b|\bseason[ .]?(\d{1,2})\b", re.I)
+COMPLETE_RE = re.compile(r"\b(complete|full[ .]season)\b", re.I)
+GROUP_RE = re.compile(r"-([A-Za-z0-9]+)(?:\.(?:mkv|mp4|avi))?\s*$|^\[([^\]]+)\]")
+LANGUAGE_RE = re.compile(
+    r"\b(multi|dual[ .-]?audio|english|eng|french|vostfr|truefrench|spanish|castellano|latino|german|"
+    r"italian|ita|russian|rus|japanese|jap|hindi|korean|portuguese|dublado|chinese)\b",
+    re.I,
+)
+
+RESOLUTIONS = {"4k": "2160p", "uhd": "2160p", "1080i": "1080p"}
+CODECS = {"x265": "x265", "h265": "x265", "hevc": "x265", "x264": "x264", "h264": "x264", "avc": "x264"}
+SOURCES = {
+    "bluray": "BluRay", "bdrip": "BluRay", "brrip": "BluRay", "remux": "Remux",
+    "webdl": "WEB-DL", "web": "WEB-DL", "webrip": "WEBRip", "hdtv": "HDTV",
+    "dvdrip": "DVD", "dvd": "DVD", "hdcam": "CAM", "cam": "CAM", "telesync": "CAM", "hdts": "CAM",
+}
+LANGUAGES = {
+    "dualaudio": "dual", "eng": "english", "vostfr": "french", "truefrench": "french", "castellano": "spanish",
+    "latino": "spanish", "ita": "italian", "rus": "russian", "jap": "japanese", "dublado": "portuguese",
+}
+
+
+def _squash(value):
+    return re.sub(r"[^a-z0-9]", "", value.lower())
+
+
+def parse_title(title):
+    """Structured attributes of a release title; missing attributes are None."""
+    attrs = {"resolution": None, "codec": None, "source": None, "season": None, "episode": None,
+             "season_pack": False, "languages": [], "group": None}
+
+    match = RESOLUTION_RE.search(title)
+    if match:
+        value = match.group(1).lower()
+        attrs["resolution"] = RESOLUTIONS.get(value, value)
+    match = CODEC_RE.search(title)
+    if match:
+        value = _squash(match.group(1))
+        attrs["codec"] = CODECS.get(value, value)
+    match = SOURCE_RE.search(title)
+    if match:
+        value = _squash(match.group(1))
+        attrs["source"] = SOURCES.get(value, value)
+
+    match = EPISODE_RE.search(title)
+    if match:
+        if match.group(1):
+            attrs["season"], attrs["episode"] = int(match.group(1)), int(match.group(2))
+        else:
+            attrs["season"], attrs["episode"] = int(match.group(4)), int(match.group(5))
+    else:
+        match = SEASON_RE.search(title)
+        if match:
+            attrs["season"] = int(match.group(1) or match.group(3))
+            attrs["season_pack"] = True
+        elif COMPLETE_RE.search(title):
+            attrs["season_pack"] = True
+
+    languages = []
+    for match in LANGUAGE_RE.finditer(title):
+        value = _squash(match.group(1))
+        value = LANGUAGES.get(value, value)
+        if value not in languages:
+            languages.append(value)
+    attrs["languages"] = languages
+
+    match = GROUP_RE.search(title.strip())
+    if match:
+        attrs["group"] = match.group(1) or match.group(2)
+    return attrs
+
+
+class TitleEnricher:
+    """Parses release titles in batches, memoizing each distinct title once."""
+
+    def __init__(self, max_entries=20000):
+        self.max_entries = max_entries
+        self.memo = OrderedDict()
+        self._restore = None
+
+    def restore_lazily(self, loader):
+        self._restore = loader
+
+    def _hydrate(self):
+        loader, self._restore = self._restore, None
+        restored = OrderedDict((title, attrs) for title, attrs in loader() or [])
+        restored.update(self.memo)
+        self.memo = restored
+        while len(self.memo) > self.max_entries:
+            self.memo.popitem(last=False)
+
+    def dump(self):
+        if self._restore is not None:
+            self._hydrate()
+        return list(self.memo.items())
+
+    def parse(self, title):
+        if self._restore is not None:
+            self._hydrate()
+        attrs = self.memo.get(title)
+        if attrs is None:
+            attrs = parse_title(title)
+            self.memo[title] = attrs
+            if len(self.memo) > self.max_entries:
+                self.memo.popitem(last=False)
+        else:
+            self.memo.move_to_end(title)
+        return attrs
+
+    def enrich(self, results):
+        for result in results:
+            if "Attrs" not in result:
+                result["Attrs"] = self.parse(result.get("Title") or "")
+        return results
+
+
+def describe(attrs):
+    parts = [attrs.get("resolution"), attrs.get("codec"), attrs.get("source")]
+    if attrs.get("season") is not None:
+        if attrs.get("episode") is not None:
+            parts.append(f"S{attrs['season']:02d}E{attrs['episode']:02d}")
+        else:
+            parts.append(f"S{attrs['season']:02d} pack")
+    elif attrs.get("season_pack"):
+        parts.append("pack")
+    parts.extend(attrs.get("languages") or [])
+    return " · ".join(p for p in parts if p)
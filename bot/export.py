@@ -0,0 +1,55 @@
+import csv
+import json
+import os
+import tempfile
+
+FIELDS = ("Query", "Title", "Size", "Seeders", "Peers", "Tracker", "PublishDate", "InfoHash", "MagnetUri", "Link")
+
+
+class ResultExport:
+    """Writes search results to a temporary CSV or JSON file as they arrive.
+
+    Rows go straight to disk, so a large batch never has to be held in
+    memory; the JSON variant is a single array written element by element.
+    """
+
+    def __init__(self, fmt="csv"):
+        if fmt not in ("csv", "json"):
+            raise ValueError(f"unsupported export format: {fmt}")
+        self.fmt = fmt
+        self.rows = 0
+        self.file = tempfile.NamedTemporaryFile(
+            "w", suffix=f".{fmt}", encoding="utf-8", newline="", delete=False
+        )
+        self.path = self.file.name
+        if fmt == "csv":
+            self._writer = csv.DictWriter(self.file, FIELDS, extrasaction="ignore")
+            self._writer.writeheader()
+        else:
+            self.file.write("[")
+
+    def write(self, query, results):
+        for result in results:
+            row = {field: result.get(field) for field in FIELDS}
+            row["Query"] = query
+            if self.fmt == "csv":
+                self._writer.writerow(row)
+            else:
+                self.file.write(",\n" if self.rows else "\n")
+                json.dump(row, self.file, ensure_ascii=False)
+            self.rows += 1
+        self.file.flush()
+
+    def finish(self):
+        if self.fmt == "json":
+            self.file.write("\n]\n")
+        self.file.close()
+        return self.path
+
+    def discard(self):
+        if not self.file.closed:
+            self.file.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
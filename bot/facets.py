@@ -0,0 +1,110 @@
+import datetime
+from email.utils import parsedate_to_datetime
+
+GB = 1024 ** 3
+
+SORTS = {
+    "seeders": "🌱 Seeders",
+    "size": "📦 Size",
+    "date": "🕒 Date",
+}
+
+SIZE_BUCKETS = [
+    ("<1 GB", 0, GB),
+    ("1-4 GB", GB, 4 * GB),
+    ("4-15 GB", 4 * GB, 15 * GB),
+    (">15 GB", 15 * GB, float("inf")),
+]
+
+FACETS = ("indexer", "size", "resolution")
+
+
+def publish_timestamp(value):
+    if not value:
+        return 0.0
+    try:
+        return datetime.datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        pass
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def size_bucket(size):
+    for name, low, high in SIZE_BUCKETS:
+        if low <= size < high:
+            return name
+    return SIZE_BUCKETS[-1][0]
+
+
+class ResultView:
+    """Sorted and filtered view over a stored result set.
+
+    Facet values are indexed once when the view is built and sort orders are
+    computed on first use, so changing sort or filters never re-queries Jackett.
+    """
+
+    def __init__(self, results):
+        self.results = results
+        self.sort = "seeders"
+        self.filters = dict.fromkeys(FACETS)
+        self._orders = {}
+        self._items = None
+        self.postings = {facet: {} for facet in FACETS}
+        for i, result in enumerate(results):
+            attrs = result.get("Attrs") or {}
+            values = {
+                "indexer": result.get("Tracker") or "?",
+                "size": size_bucket(result.get("Size") or 0),
+                "resolution": attrs.get("resolution") or "other",
+            }
+            for facet, value in values.items():
+                self.postings[facet].setdefault(value, set()).add(i)
+
+    def _order(self, sort):
+        order = self._orders.get(sort)
+        if order is None:
+            if sort == "size":
+                key = lambda i: self.results[i].get("Size") or 0
+            elif sort == "date":
+                key = lambda i: publish_timestamp(self.results[i].get("PublishDate"))
+            else:
+                key = lambda i: self.results[i].get("Seeders") or 0
+            order = sorted(range(len(self.results)), key=key, reverse=True)
+            self._orders[sort] = order
+        return order
+
+    def items(self):
+        if self._items is None:
+            selected = [self.postings[f][v] for f, v in self.filters.items() if v is not None]
+            self._items = [
+                self.results[i] for i in self._order(self.sort) if all(i in s for s in selected)
+            ]
+        return self._items
+
+    def options(self, facet):
+        if facet == "size":
+            return [name for name, _, _ in SIZE_BUCKETS if name in self.postings["size"]]
+        return sorted(self.postings[facet])
+
+    def set_sort(self, sort):
+        if sort in SORTS:
+            self.sort = sort
+            self._items = None
+
+    def cycle(self, facet):
+        """Advance a filter to the next available value, wrapping back to "any"."""
+        options = [None] + self.options(facet)
+        current = self.filters[facet]
+        position = options.index(current) if current in options else 0
+        self.filters[facet] = options[(position + 1) % len(options)]
+        self._items = None
+
+    def extend(self, results):
+        """A view over this result set plus ``results``, keeping sort and filters."""
+        view = ResultView(self.results + list(results))
+        view.sort = self.sort
+        view.filters = dict(self.filters)
+        return view
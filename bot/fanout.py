@@ -0,0 +1,112 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SearchFailed(Exception):
+    pass
+
+
+class SearchRun:
+    """One search fanned out to every indexer, collecting results as they land.
+
+    Callers can wait for a deadline and read whatever has arrived so far, then
+    keep following ``changes()`` for late results.
+    """
+
+    def __init__(self, fetchers, stats=None, enrich=None):
+        self.fetchers = fetchers
+        self.stats = stats
+        self.enrich = enrich
+        self.names = {indexer: name for indexer, (name, _) in fetchers.items()}
+        self.results = []
+        self.pending = set(fetchers)
+        self.failed = {}
+        self.finished = asyncio.Event()
+        self.cancelled = False
+        self._changed = asyncio.Event()
+        self._collector = None
+
+    @classmethod
+    def completed(cls, results):
+        run = cls({})
+        run.results = list(results)
+        run.finished.set()
+        return run
+
+    @property
+    def indexers(self):
+        return list(self.fetchers)
+
+    @property
+    def pending_names(self):
+        return sorted(self.names[i] for i in self.pending)
+
+    @property
+    def failed_names(self):
+        return sorted(self.names[i] for i in self.failed)
+
+    def start(self):
+        self._collector = asyncio.ensure_future(self._collect())
+        return self
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        tasks = {asyncio.ensure_future(fetch()): indexer for indexer, (_, fetch) in self.fetchers.items()}
+        waiting = set(tasks)
+        try:
+            while waiting:
+                done, waiting = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+                elapsed = loop.time() - started
+                for task in done:
+                    indexer = tasks[task]
+                    self.pending.discard(indexer)
+                    try:
+                        results = task.result()
+                    except Exception as e:
+                        self.failed[indexer] = str(e) or type(e).__name__
+                        logger.warning(f"Indexer {indexer} failed after {elapsed:.1f}s: {self.failed[indexer]}")
+                        ok = False
+                    else:
+                        self.results.extend(self.enrich(results) if self.enrich else results)
+                        ok = True
+                    if self.stats is not None:
+                        self.stats.record(indexer, elapsed, ok)
+                self._notify()
+        finally:
+            for task in waiting:
+                task.cancel()
+            self.finished.set()
+            self._notify()
+
+    def _notify(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait(self, timeout):
+        """Wait until every indexer answered or ``timeout`` seconds passed."""
+        try:
+            await asyncio.wait_for(self.finished.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.finished.is_set()
+
+    async def changes(self):
+        while not self.finished.is_set():
+            await self._changed.wait()
+            yield
+
+    async def result(self):
+        await self.finished.wait()
+        if self.cancelled:
+            raise SearchFailed("search was cancelled")
+        if self.fetchers and len(self.failed) == len(self.fetchers):
+            raise SearchFailed("; ".join(f"{self.names[i]}: {e}" for i, e in self.failed.items()))
+        return self.results
+
+    def cancel(self):
+        if self._collector is not None and not self._collector.done():
+            self.cancelled = True
+            self._collector.cancel()
@@ -0,0 +1,151 @@
+import logging
+import os
+import re
+import sqlite3
+import time
+
+from jackett import infohash
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"\w+")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    key TEXT UNIQUE NOT NULL,
+    title TEXT NOT NULL,
+    tracker TEXT,
+    size INTEGER,
+    seeders INTEGER,
+    peers INTEGER,
+    publish_date TEXT,
+    link TEXT,
+    magnet TEXT,
+    details TEXT,
+    seen_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_seen_at ON results (seen_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS results_fts USING fts5(
+    title, content='results', content_rowid='id', tokenize='unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS results_ai AFTER INSERT ON results BEGIN
+    INSERT INTO results_fts (rowid, title) VALUES (new.id, new.title);
+END;
+CREATE TRIGGER IF NOT EXISTS results_ad AFTER DELETE ON results BEGIN
+    INSERT INTO results_fts (results_fts, rowid, title) VALUES ('delete', old.id, old.title);
+END;
+CREATE TRIGGER IF NOT EXISTS results_au AFTER UPDATE OF title ON results BEGIN
+    INSERT INTO results_fts (results_fts, rowid, title) VALUES ('delete', old.id, old.title);
+    INSERT INTO results_fts (rowid, title) VALUES (new.id, new.title);
+END;
+"""
+
+UPSERT = """
+INSERT INTO results (key, title, tracker, size, seeders, peers, publish_date, link, magnet, details, seen_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (key) DO UPDATE SET
+    seeders = excluded.seeders,
+    peers = excluded.peers,
+    link = excluded.link,
+    magnet = COALESCE(excluded.magnet, results.magnet),
+    seen_at = excluded.seen_at
+"""
+
+
+class ResultIndex:
+    """Persistent full-text index of every result fetched from Jackett.
+
+    ``search`` reads through ``self.conn`` on the event loop; WAL mode keeps
+    those reads from waiting on writers. ``ingest`` and ``compact`` open their
+    own connection, so they can run in a worker thread and wait for each
+    other's write lock without stalling the loop.
+    """
+
+    def __init__(self, path, max_rows=200000, max_age_days=30):
+        self.path = path
+        self.max_rows = max_rows
+        self.max_age = max_age_days * 86400
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=60)
+
+    def ingest(self, results):
+        now = time.time()
+        rows = [
+            (
+                infohash(r),
+                r.get("Title") or "",
+                r.get("Tracker"),
+                r.get("Size", 0),
+                r.get("Seeders", 0),
+                r.get("Peers", 0),
+                r.get("PublishDate"),
+                r.get("Link"),
+                r.get("MagnetUri"),
+                r.get("Details"),
+                now,
+            )
+            for r in results
+            if r.get("Title")
+        ]
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(UPSERT, rows)
+        finally:
+            conn.close()
+
+    def search(self, query, limit=50):
+        tokens = TOKEN_RE.findall(query.lower())
+        if not tokens:
+            return []
+        match = " ".join('"{}"'.format(t) for t in tokens)
+        rows = self.conn.execute(
+            "SELECT r.title, r.tracker, r.size, r.seeders, r.peers, r.publish_date, r.link, r.magnet, r.details "
+            "FROM results_fts JOIN results r ON r.id = results_fts.rowid "
+            "WHERE results_fts MATCH ? ORDER BY r.seeders DESC LIMIT ?",
+            (match, limit),
+        ).fetchall()
+        return [
+            {
+                "Title": title,
+                "Tracker": tracker,
+                "Size": size,
+                "Seeders": seeders,
+                "Peers": peers,
+                "PublishDate": publish_date,
+                "Link": link,
+                "MagnetUri": magnet,
+                "Details": details,
+            }
+            for title, tracker, size, seeders, peers, publish_date, link, magnet, details in rows
+        ]
+
+    def compact(self):
+        """Drop expired and overflowing rows."""
+        cutoff = time.time() - self.max_age
+        conn = self._connect()
+        try:
+            with conn:
+                expired = conn.execute("DELETE FROM results WHERE seen_at < ?", (cutoff,)).rowcount
+                (count,) = conn.execute("SELECT COUNT(*) FROM results").fetchone()
+                overflow = max(0, count - self.max_rows)
+                if overflow:
+                    conn.execute(
+                        "DELETE FROM results WHERE id IN (SELECT id FROM results ORDER BY seen_at LIMIT ?)",
+                        (overflow,),
+                    )
+                conn.execute("INSERT INTO results_fts (results_fts) VALUES ('optimize')")
+            conn.execute("PRAGMA incremental_vacuum")
+        finally:
+            conn.close()
+        logger.info(f"Result index compacted: {expired} expired, {overflow} over limit removed")
+
+    def close(self):
+        self.conn.close()
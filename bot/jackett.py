@@ -0,0 +1,108 @@
+import json
+import logging
+import re
+from xml.etree import ElementTree as ET
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+BTIH_RE = re.compile(r"xt=urn:btih:([0-9a-zA-Z]+)")
+TORZNAB_NS = "{http://torznab.com/schemas/2015/feed}"
+
+
+def infohash(result):
+    """Stable identity for a Jackett result: infohash when known, else guid/link."""
+    value = result.get("InfoHash")
+    if value:
+        return value.lower()
+    match = BTIH_RE.search(result.get("MagnetUri") or "")
+    if match:
+        return match.group(1).lower()
+    return result.get("Guid") or result.get("Link") or result.get("Title", "")
+
+
+def parse_torznab(xml_data):
+    """Convert a Torznab RSS feed into the same dicts the JSON results API returns."""
+    root = ET.fromstring(xml_data)
+    results = []
+    for item in root.iter("item"):
+        attrs = {a.get("name"): a.get("value") for a in item.iter(f"{TORZNAB_NS}attr")}
+        indexer = item.find("jackettindexer")
+        results.append({
+            "Title": item.findtext("title"),
+            "Guid": item.findtext("guid"),
+            "Link": item.findtext("link"),
+            "Details": item.findtext("comments"),
+            "PublishDate": item.findtext("pubDate"),
+            "Tracker": indexer.text if indexer is not None else None,
+            "TrackerId": indexer.get("id") if indexer is not None else None,
+            "Size": int(item.findtext("size") or attrs.get("size") or 0),
+            "Seeders": int(attrs.get("seeders") or 0),
+            "Peers": int(attrs.get("peers") or 0),
+            "MagnetUri": attrs.get("magneturl"),
+            "InfoHash": attrs.get("infohash"),
+        })
+    results.sort(key=lambda r: r["Seeders"], reverse=True)
+    return results
+
+
+class JackettClient:
+    def __init__(self, base_url, api_key, timeout=10):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout = timeout
+        self._session = None
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(raise_for_status=True)
+        return self._session
+
+    async def _get(self, path, params, timeout=None):
+        session = self._get_session()
+        client_timeout = aiohttp.ClientTimeout(total=timeout or self.timeout)
+        async with session.get(f"{self.base_url}{path}", params=params, timeout=client_timeout) as response:
+            return await response.text()
+
+    async def indexers(self):
+        """(id, name) pairs of the indexers configured in Jackett."""
+        params = {"apikey": self.api_key, "t": "indexers", "configured": "true"}
+        xml_data = await self._get("/api/v2.0/indexers/all/results/torznab/api", params)
+        root = ET.fromstring(xml_data)
+        return [(el.get("id"), el.findtext("title") or el.get("id")) for el in root.iter("indexer")]
+
+    async def search(self, query, indexer="all", limit=50, timeout=None):
+        params = {
+            "apikey": self.api_key,
+            "Query": query,
+            "Limit": str(limit),
+            "SortBy": "seeders",
+            "SortDirection": "desc",
+        }
+        body = await self._get(f"/api/v2.0/indexers/{indexer}/results", params, timeout)
+        return json.loads(body).get("Results", [])
+
+    async def search_canonical(self, query, indexer="all", limit=50, timeout=None):
+        """Search using structured Torznab params when the query has them."""
+        if query.mode == "search":
+            return await self.search(query.search_text, indexer, limit, timeout)
+        params = {"apikey": self.api_key, "limit": str(limit), **query.torznab_params()}
+        xml_data = await self._get(f"/api/v2.0/indexers/{indexer}/results/torznab/api", params, timeout)
+        return parse_torznab(xml_data)
+
+    async def indexer_config(self, indexer):
+        """Configuration fields of an indexer (admin API, open when no admin password is set)."""
+        body = await self._get(f"/api/v2.0/indexers/{indexer}/config", {"apikey": self.api_key})
+        return json.loads(body)
+
+    async def set_indexer_config(self, indexer, fields):
+        session = self._get_session()
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        url = f"{self.base_url}/api/v2.0/indexers/{indexer}/config"
+        async with session.post(url, params={"apikey": self.api_key}, json=fields, timeout=timeout):
+            pass
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
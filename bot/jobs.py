@@ -0,0 +1,67 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    def __init__(self, key, subscriber):
+        self.key = key
+        self.subscribers = [subscriber]
+
+
+class JobQueue:
+    """Bounded worker pool running one job per key.
+
+    Submitting a key that is already queued or running attaches another
+    subscriber to the existing job instead of doing the work twice. A job's
+    ``execute`` step is cancelled once it exceeds ``budget`` seconds; its
+    result (or the exception) is then handed to ``deliver`` for every
+    subscriber.
+    """
+
+    def __init__(self, execute, deliver, workers=4, budget=90):
+        self.execute = execute
+        self.deliver = deliver
+        self.workers = workers
+        self.budget = budget
+        self.jobs = {}
+        self.queue = None
+        self._tasks = []
+
+    def submit(self, key, subscriber):
+        job = self.jobs.get(key)
+        if job is not None:
+            job.subscribers.append(subscriber)
+            return False
+        job = Job(key, subscriber)
+        self.jobs[key] = job
+        self.queue.put_nowait(job)
+        return True
+
+    def start(self):
+        self.queue = asyncio.Queue()
+        self._tasks = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+
+    async def _work(self):
+        while True:
+            job = await self.queue.get()
+            try:
+                outcome = await asyncio.wait_for(self.execute(job), self.budget)
+            except asyncio.TimeoutError:
+                logger.warning(f"Job {job.key} exceeded its {self.budget}s budget")
+                outcome = asyncio.TimeoutError(f"took longer than {self.budget}s")
+            except Exception as e:
+                outcome = e
+            finally:
+                self.jobs.pop(job.key, None)
+                self.queue.task_done()
+            for subscriber in job.subscribers:
+                try:
+                    await self.deliver(subscriber, outcome)
+                except Exception as e:
+                    logger.error(f"Delivering job {job.key} failed: {e}")
@@ -0,0 +1,124 @@
+import datetime
+import re
+
+SEPARATOR_RE = re.compile(r"[\s._\-+\[\](){},:;!?'\"/\\|]+")
+SXXEXX_RE = re.compile(r"^s(\d{1,2})(?:e(\d{1,3}))?$")
+NXNN_RE = re.compile(r"^(\d{1,2})x(\d{1,3})$")
+EPISODE_RE = re.compile(r"^e(\d{1,3})$")
+YEAR_RE = re.compile(r"^(19\d\d|20\d\d)$")
+NUMBER_RE = re.compile(r"^\d{1,3}$")
+APOSTROPHE_RE = re.compile(r"(?<=\w)['’](?=\w)")
+ACRONYM_RE = re.compile(r"\b(?:[a-z]\.){2,}(?:[a-z]\b)?", re.I)
+
+
+def _number(value):
+    return None if value == "None" else int(value)
+
+
+class CanonicalQuery:
+    """Normalized form of a user query.
+
+    ``mode`` follows Torznab: ``tvsearch`` when a season/episode was found,
+    ``movie`` when only a year was found and ``search`` otherwise. ``text``
+    is the normalized form used in the cache key; ``search_text`` is what is
+    sent upstream, with apostrophes and dotted acronyms kept as whole words.
+    """
+
+    def __init__(self, text, season=None, episode=None, year=None, search_text=None):
+        self.text = text
+        self.search_text = search_text or text
+        self.season = season
+        self.episode = episode
+        self.year = year
+        if season is not None:
+            self.mode = "tvsearch"
+        elif year is not None:
+            self.mode = "movie"
+        else:
+            self.mode = "search"
+
+    @property
+    def display(self):
+        """Plain query string equivalent, for backends without structured params."""
+        parts = [self.search_text]
+        if self.season is not None:
+            parts.append(f"S{self.season:02d}" + (f"E{self.episode:02d}" if self.episode is not None else ""))
+        if self.year is not None:
+            parts.append(str(self.year))
+        return " ".join(p for p in parts if p)
+
+    @property
+    def key(self):
+        return f"{self.mode}|{self.text}|{self.season}|{self.episode}|{self.year}"
+
+    @classmethod
+    def from_key(cls, key):
+        _, text, season, episode, year = key.split("|")
+        return cls(text, _number(season), _number(episode), _number(year))
+
+    def torznab_params(self):
+        params = {"t": self.mode, "q": self.search_text}
+        if self.season is not None:
+            params["season"] = str(self.season)
+        if self.episode is not None:
+            params["ep"] = str(self.episode)
+        if self.year is not None:
+            if self.mode == "movie":
+                params["year"] = str(self.year)
+            else:
+                params["q"] = f"{self.search_text} {self.year}"
+        return params
+
+    def __repr__(self):
+        return f"CanonicalQuery({self.key!r})"
+
+
+def _tokens(raw):
+    return [t for t in SEPARATOR_RE.split(raw.lower()) if t]
+
+
+def _parse(tokens, max_year):
+    words = []
+    season = episode = year = None
+    ranged = False
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        following = tokens[i + 1] if i + 1 < len(tokens) else None
+        match = SXXEXX_RE.match(token) or NXNN_RE.match(token)
+        if match and season is not None:
+            ranged = True
+        elif match:
+            season = int(match.group(1))
+            if match.group(2):
+                episode = int(match.group(2))
+        elif EPISODE_RE.match(token) and season is not None and episode is None:
+            episode = int(token[1:])
+        elif token == "season" and following and NUMBER_RE.match(following) and season is None:
+            season = int(following)
+            i += 1
+        elif token in ("episode", "ep") and following and NUMBER_RE.match(following) and episode is None:
+            episode = int(following)
+            i += 1
+        elif YEAR_RE.match(token) and year is None and words and int(token) <= max_year:
+            year = int(token)
+        else:
+            words.append(token)
+        i += 1
+    if ranged:
+        # Torznab takes a single season; a range like S01-S10 searches the title alone.
+        season = episode = None
+    if episode is not None and season is None:
+        words.append(str(episode))
+        episode = None
+    return words, season, episode, year
+
+
+def canonicalize(raw):
+    max_year = datetime.date.today().year + 1
+    words, season, episode, year = _parse(_tokens(raw), max_year)
+    if not words:
+        return CanonicalQuery("")
+    joined = ACRONYM_RE.sub(lambda m: m.group().replace(".", ""), APOSTROPHE_RE.sub("", raw))
+    search_words = _parse(_tokens(joined), max_year)[0]
+    return CanonicalQuery(" ".join(words), season, episode, year, " ".join(search_words))
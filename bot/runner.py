@@ -0,0 +1,104 @@
+import asyncio
+import logging
+
+from telegram.error import RetryAfter, TimedOut
+
+from storage import atomic_write
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateDispatcher:
+    """Processes updates concurrently while keeping each chat's updates in order.
+
+    Every update waits for the previous update of the same chat, so only
+    updates from different chats run side by side, bounded by ``concurrency``.
+    """
+
+    def __init__(self, application, concurrency=32):
+        self.application = application
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._chains = {}
+        self.backlog = 0
+
+    @staticmethod
+    def _chain_key(update):
+        chat = update.effective_chat
+        return chat.id if chat else f"update:{update.update_id}"
+
+    def busy(self, update):
+        return self._chain_key(update) in self._chains
+
+    def submit(self, update):
+        key = self._chain_key(update)
+        task = asyncio.ensure_future(self._run(update, self._chains.get(key)))
+        self._chains[key] = task
+        self.backlog += 1
+
+        def done(finished):
+            self.backlog -= 1
+            if self._chains.get(key) is finished:
+                del self._chains[key]
+
+        task.add_done_callback(done)
+        return task
+
+    async def _run(self, update, previous):
+        if previous is not None:
+            await asyncio.wait({previous})
+        async with self._semaphore:
+            try:
+                await self.application.process_update(update)
+            except Exception as e:
+                logger.error(f"Error processing update {update.update_id}: {e}")
+
+
+def load_offset(path):
+    try:
+        with open(path, "r") as file:
+            return int(file.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def save_offset(path, offset):
+    with atomic_write(path) as file:
+        file.write(str(offset))
+
+
+async def poll_updates(bot, handle_update, offset_path, limit=100, timeout=50, allowed_updates=None):
+    """Long-poll getUpdates in batches and pass every update to ``handle_update``.
+
+    The offset is persisted after each batch so a restart resumes where the
+    previous process stopped instead of replaying or skipping updates.
+    """
+    offset = load_offset(offset_path)
+    backoff = 1
+    while True:
+        try:
+            updates = await bot.get_updates(
+                offset=offset or None,
+                limit=limit,
+                timeout=timeout,
+                read_timeout=timeout + 10,
+                allowed_updates=allowed_updates,
+            )
+        except TimedOut:
+            continue
+        except RetryAfter as e:
+            await asyncio.sleep(e.retry_after)
+            continue
+        except Exception as e:
+            logger.error(f"getUpdates failed, retrying in {backoff}s: {e!r}")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 60)
+            continue
+        backoff = 1
+        for update in updates:
+            try:
+                await handle_update(update)
+            except Exception as e:
+                logger.error(f"Error accepting update {update.update_id}: {e}")
+        if updates:
+            offset = updates[-1].update_id + 1
+            save_offset(offset_path, offset)
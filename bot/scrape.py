@@ -0,0 +1,189 @@
+import asyncio
+import base64
+import binascii
+import logging
+import random
+import re
+import struct
+import time
+from urllib.parse import parse_qs, urlsplit
+
+logger = logging.getLogger(__name__)
+
+PROTOCOL_ID = 0x41727101980
+ACTION_CONNECT = 0
+ACTION_SCRAPE = 2
+ACTION_ERROR = 3
+MAX_HASHES_PER_PACKET = 74
+HEX_HASH_RE = re.compile(r"^[0-9a-fA-F]{40}$")
+
+
+class ScrapeError(Exception):
+    pass
+
+
+def parse_magnet(magnet):
+    """Hex infohash and UDP tracker (host, port) pairs of a magnet link."""
+    if not magnet or not magnet.startswith("magnet:?"):
+        return None, []
+    params = parse_qs(magnet[len("magnet:?"):])
+    infohash = None
+    for xt in params.get("xt", []):
+        if xt.lower().startswith("urn:btih:"):
+            value = xt[len("urn:btih:"):]
+            if HEX_HASH_RE.match(value):
+                infohash = value.lower()
+            elif len(value) == 32:
+                try:
+                    infohash = base64.b32decode(value.upper()).hex()
+                except binascii.Error:
+                    continue
+    trackers = []
+    for tr in params.get("tr", []):
+        try:
+            url = urlsplit(tr)
+            port = url.port
+        except ValueError:
+            continue
+        if url.scheme == "udp" and url.hostname and port:
+            trackers.append((url.hostname, port))
+    return infohash, trackers
+
+
+class _TrackerProtocol(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.waiters = {}
+
+    def datagram_received(self, data, addr):
+        if len(data) < 8:
+            return
+        action, transaction_id = struct.unpack_from(">II", data)
+        waiter = self.waiters.pop(transaction_id, None)
+        if waiter is None or waiter.done():
+            return
+        if action == ACTION_ERROR:
+            waiter.set_exception(ScrapeError(data[8:].decode("utf-8", errors="replace")))
+        else:
+            waiter.set_result((action, data))
+
+    def error_received(self, exc):
+        for waiter in self.waiters.values():
+            if not waiter.done():
+                waiter.set_exception(exc)
+        self.waiters.clear()
+
+
+async def _request(transport, protocol, payload_for):
+    transaction_id = random.getrandbits(32)
+    waiter = asyncio.get_running_loop().create_future()
+    protocol.waiters[transaction_id] = waiter
+    transport.sendto(payload_for(transaction_id))
+    try:
+        return await waiter
+    finally:
+        protocol.waiters.pop(transaction_id, None)
+
+
+async def scrape_tracker(host, port, infohashes):
+    """Seeders/leechers for ``infohashes`` from one UDP tracker (BEP 15).
+
+    All scrape packets share one connection id and are sent concurrently,
+    packing up to 74 infohashes each.
+    """
+    loop = asyncio.get_running_loop()
+    transport, protocol = await loop.create_datagram_endpoint(_TrackerProtocol, remote_addr=(host, port))
+    try:
+        action, data = await _request(
+            transport, protocol, lambda tid: struct.pack(">QII", PROTOCOL_ID, ACTION_CONNECT, tid)
+        )
+        if action != ACTION_CONNECT or len(data) < 16:
+            raise ScrapeError("bad connect response")
+        (connection_id,) = struct.unpack_from(">Q", data, 8)
+
+        async def scrape_batch(batch):
+            packed = b"".join(bytes.fromhex(h) for h in batch)
+            action, data = await _request(
+                transport, protocol, lambda tid: struct.pack(">QII", connection_id, ACTION_SCRAPE, tid) + packed
+            )
+            if action != ACTION_SCRAPE or len(data) < 8 + 12 * len(batch):
+                raise ScrapeError("bad scrape response")
+            stats = {}
+            for i, infohash in enumerate(batch):
+                seeders, _, leechers = struct.unpack_from(">III", data, 8 + 12 * i)
+                stats[infohash] = (seeders, leechers)
+            return stats
+
+        batches = [infohashes[i:i + MAX_HASHES_PER_PACKET] for i in range(0, len(infohashes), MAX_HASHES_PER_PACKET)]
+        merged = {}
+        for stats in await asyncio.gather(*(scrape_batch(b) for b in batches)):
+            merged.update(stats)
+        return merged
+    finally:
+        transport.close()
+
+
+class SeederRefresher:
+    """Refreshes seeder counts of magnet results by scraping their UDP trackers.
+
+    Infohashes are grouped per tracker and every tracker is scraped
+    concurrently; whatever has answered by the deadline is applied.
+    """
+
+    def __init__(self, deadline=1.5, ttl=300, max_trackers=20, max_entries=20000):
+        self.deadline = deadline
+        self.ttl = ttl
+        self.max_trackers = max_trackers
+        self.max_entries = max_entries
+        self.cache = {}
+
+    def _fresh(self, infohash, now):
+        entry = self.cache.get(infohash)
+        return entry is not None and now - entry[0] < self.ttl
+
+    async def refresh(self, results):
+        now = time.time()
+        by_tracker = {}
+        targets = {}
+        for result in results:
+            infohash, trackers = parse_magnet(result.get("MagnetUri"))
+            if not infohash:
+                continue
+            targets.setdefault(infohash, []).append(result)
+            if not self._fresh(infohash, now):
+                for tracker in trackers:
+                    by_tracker.setdefault(tracker, set()).add(infohash)
+
+        if by_tracker:
+            trackers = sorted(by_tracker, key=lambda t: len(by_tracker[t]), reverse=True)[:self.max_trackers]
+            tasks = {
+                asyncio.ensure_future(scrape_tracker(host, port, sorted(by_tracker[(host, port)]))): (host, port)
+                for host, port in trackers
+            }
+            done, pending = await asyncio.wait(tasks, timeout=self.deadline)
+            for task in pending:
+                task.cancel()
+            fresh = {}
+            for task in done:
+                if task.exception() is not None:
+                    logger.debug(f"Scrape of {tasks[task]} failed: {task.exception()}")
+                    continue
+                for infohash, (seeders, leechers) in task.result().items():
+                    best = fresh.get(infohash)
+                    if best is None or seeders > best[0]:
+                        fresh[infohash] = (seeders, leechers)
+            for infohash, (seeders, leechers) in fresh.items():
+                self.cache[infohash] = (now, seeders, leechers)
+            if len(self.cache) > self.max_entries:
+                for infohash in [h for h in self.cache if not self._fresh(h, now)]:
+                    del self.cache[infohash]
+
+        refreshed = 0
+        for infohash, matches in targets.items():
+            if self._fresh(infohash, now):
+                _, seeders, leechers = self.cache[infohash]
+                for result in matches:
+                    result["Seeders"] = seeders
+                    result["Peers"] = seeders + leechers
+                    result["SeedersLive"] = True
+                refreshed += 1
+        return refreshed
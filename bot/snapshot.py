@@ -0,0 +1,81 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import zlib
+
+from storage import atomic_write
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"TGJSNAP1"
+HEADER = struct.Struct(">8sI")
+
+
+def write_snapshot(path, sections):
+    """Write ``sections`` (name -> JSON-serializable state) as one compact file.
+
+    Layout: magic, the length of a JSON table of contents, the table of
+    contents mapping each name to its (offset, length), then one
+    zlib-compressed JSON blob per section.
+    """
+    blobs = {name: zlib.compress(json.dumps(state, separators=(",", ":")).encode(), 6)
+             for name, state in sections.items()}
+    offset = 0
+    toc = {}
+    for name, blob in blobs.items():
+        toc[name] = (offset, len(blob))
+        offset += len(blob)
+    toc_bytes = json.dumps(toc).encode()
+
+    with atomic_write(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, len(toc_bytes)))
+        file.write(toc_bytes)
+        for blob in blobs.values():
+            file.write(blob)
+    return HEADER.size + len(toc_bytes) + offset
+
+
+class Snapshot:
+    """Memory-mapped reader that only decompresses a section when asked for it."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._map = None
+        self.toc = {}
+        self._base = 0
+        if not os.path.exists(path):
+            return
+        try:
+            self._file = open(path, "rb")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, toc_length = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC:
+                raise ValueError("not a bot snapshot")
+            self._base = HEADER.size + toc_length
+            self.toc = json.loads(self._map[HEADER.size:self._base])
+        except (OSError, ValueError, struct.error) as e:
+            logger.error(f"Ignoring unreadable snapshot {path}: {e}")
+            self.close()
+            self.toc = {}
+
+    def section(self, name, default=None):
+        if name not in self.toc or self._map is None:
+            return default
+        offset, length = self.toc[name]
+        start = self._base + offset
+        try:
+            return json.loads(zlib.decompress(self._map[start:start + length]))
+        except (zlib.error, ValueError) as e:
+            logger.error(f"Snapshot section {name} is corrupt: {e}")
+            return default
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,52 @@
+from collections import deque
+
+
+class IndexerStats:
+    """Rolling per-indexer latency samples and success/failure counts."""
+
+    def __init__(self, window=50, default_latency=8.0):
+        self.window = window
+        self.default_latency = default_latency
+        self.latencies = {}
+        self.successes = {}
+        self.failures = {}
+
+    def record(self, indexer, elapsed, ok=True):
+        self.latencies.setdefault(indexer, deque(maxlen=self.window)).append(elapsed)
+        counts = self.successes if ok else self.failures
+        counts[indexer] = counts.get(indexer, 0) + 1
+
+    def dump(self):
+        return {
+            "latencies": {indexer: list(samples) for indexer, samples in self.latencies.items()},
+            "successes": self.successes,
+            "failures": self.failures,
+        }
+
+    def load(self, state):
+        if not state:
+            return
+        for indexer, samples in state.get("latencies", {}).items():
+            self.latencies[indexer] = deque(samples, maxlen=self.window)
+        self.successes.update(state.get("successes", {}))
+        self.failures.update(state.get("failures", {}))
+
+    def percentile(self, indexer, q=0.9):
+        samples = self.latencies.get(indexer)
+        if not samples:
+            return self.default_latency
+        ordered = sorted(samples)
+        return ordered[int(q * (len(ordered) - 1))]
+
+    def deadline(self, indexers, minimum, maximum, q=0.9, coverage=0.8):
+        """Time by which ``coverage`` of the indexers usually answer.
+
+        Each indexer contributes its ``q`` latency percentile; the deadline is
+        the ``coverage`` quantile of those, so a handful of chronically slow
+        indexers cannot stretch it.
+        """
+        if not indexers:
+            return maximum
+        per_indexer = sorted(self.percentile(i, q) for i in indexers)
+        value = per_indexer[int(coverage * (len(per_indexer) - 1))]
+        return max(minimum, min(maximum, value))
@@ -0,0 +1,245 @@
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import os
+import re
+from collections import OrderedDict
+
+import aiohttp
+
+from jackett import infohash
+from storage import atomic_write
+
+logger = logging.getLogger(__name__)
+
+HEX_HASH_RE = re.compile(r"^[0-9a-f]{40}$")
+BASE32_HASH_RE = re.compile(r"^[a-z2-7]{32}$")
+
+
+class BencodeError(ValueError):
+    pass
+
+
+class MetadataUnavailable(Exception):
+    pass
+
+
+class _Decoder:
+    """Single-pass bencode decoder over a size-capped buffer.
+
+    Byte strings longer than ``skip_over`` (piece hashes, mostly) are not
+    copied; only their length is kept. The raw span of the top-level ``info``
+    dict is recorded so the infohash can be computed without re-encoding.
+    """
+
+    def __init__(self, data, max_depth=32, skip_over=4096):
+        self.data = memoryview(data)
+        self.pos = 0
+        self.max_depth = max_depth
+        self.skip_over = skip_over
+        self.info_span = None
+
+    def decode(self):
+        value = self._value(0)
+        if self.pos != len(self.data):
+            raise BencodeError("trailing data after torrent")
+        return value
+
+    def _value(self, depth):
+        if depth > self.max_depth:
+            raise BencodeError("nesting too deep")
+        if self.pos >= len(self.data):
+            raise BencodeError("unexpected end of data")
+        lead = self.data[self.pos]
+        if lead == ord("i"):
+            end = self._find(ord("e"), self.pos + 1)
+            value = int(bytes(self.data[self.pos + 1:end]))
+            self.pos = end + 1
+            return value
+        if lead == ord("l"):
+            self.pos += 1
+            items = []
+            while self._peek() != ord("e"):
+                items.append(self._value(depth + 1))
+            self.pos += 1
+            return items
+        if lead == ord("d"):
+            self.pos += 1
+            items = {}
+            while self._peek() != ord("e"):
+                key = self._string()
+                start = self.pos
+                items[key] = self._value(depth + 1)
+                if depth == 0 and key == b"info":
+                    self.info_span = (start, self.pos)
+            self.pos += 1
+            return items
+        if ord("0") <= lead <= ord("9"):
+            return self._string()
+        raise BencodeError(f"invalid token at offset {self.pos}")
+
+    def _peek(self):
+        if self.pos >= len(self.data):
+            raise BencodeError("unexpected end of data")
+        return self.data[self.pos]
+
+    def _find(self, byte, start):
+        for i in range(start, min(len(self.data), start + 32)):
+            if self.data[i] == byte:
+                return i
+        raise BencodeError("malformed length or integer")
+
+    def _string(self):
+        colon = self._find(ord(":"), self.pos)
+        length = int(bytes(self.data[self.pos:colon]))
+        start = colon + 1
+        end = start + length
+        if end > len(self.data):
+            raise BencodeError("string runs past end of data")
+        self.pos = end
+        if length > self.skip_over:
+            return length
+        return bytes(self.data[start:end])
+
+
+def hex_infohash(value):
+    """Hex form of a hex or base32 infohash, the key metadata is cached under."""
+    if HEX_HASH_RE.match(value):
+        return value
+    if BASE32_HASH_RE.match(value):
+        return base64.b32decode(value.upper()).hex()
+    return None
+
+
+def _text(value):
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    return str(value)
+
+
+def parse_torrent(data):
+    """Name, file list, total size and infohash of a .torrent file."""
+    decoder = _Decoder(data)
+    meta = decoder.decode()
+    info = meta.get(b"info") if isinstance(meta, dict) else None
+    if not isinstance(info, dict) or decoder.info_span is None:
+        raise BencodeError("torrent has no info dictionary")
+    start, end = decoder.info_span
+    name = _text(info.get(b"name.utf-8") or info.get(b"name") or b"")
+    if b"files" in info:
+        files = [
+            ("/".join(_text(p) for p in (f.get(b"path.utf-8") or f.get(b"path") or [])), f.get(b"length", 0))
+            for f in info[b"files"]
+        ]
+    else:
+        files = [(name, info.get(b"length", 0))]
+    return {
+        "infohash": hashlib.sha1(bytes(decoder.data[start:end])).hexdigest(),
+        "name": name,
+        "files": files,
+        "total": sum(length for _, length in files),
+    }
+
+
+class TorrentMetadata:
+    """Fetches .torrent files through Jackett and caches their metadata by infohash.
+
+    Lookups hit the in-memory LRU first, then the on-disk cache, and only then
+    Jackett; concurrent downloads are bounded so previews never compete with
+    interactive searches for upstream capacity.
+    """
+
+    def __init__(self, cache_dir, max_bytes=4 * 1024 * 1024, concurrency=2, timeout=20, max_entries=500):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self.memory = OrderedDict()
+        self._links = OrderedDict()
+        self._inflight = {}
+        self.concurrency = concurrency
+        self._semaphore = None
+        self._session = None
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _remember(self, key, meta):
+        self.memory[key] = meta
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def _cached(self, key):
+        meta = self.memory.get(key)
+        if meta is not None:
+            self.memory.move_to_end(key)
+            return meta
+        path = os.path.join(self.cache_dir, f"{key}.json")
+        if os.path.exists(path):
+            with open(path, "r") as file:
+                meta = json.load(file)
+            self._remember(key, meta)
+            return meta
+        return None
+
+    def _store(self, meta):
+        self._remember(meta["infohash"], meta)
+        with atomic_write(os.path.join(self.cache_dir, f"{meta['infohash']}.json")) as file:
+            json.dump(meta, file)
+
+    async def get(self, result):
+        link = result.get("Link")
+        key = hex_infohash(infohash(result)) or self._links.get(link)
+        if key:
+            meta = self._cached(key)
+            if meta is not None:
+                return meta
+        if not link or not link.startswith(("http://", "https://")):
+            raise MetadataUnavailable("no .torrent link for this result")
+
+        future = self._inflight.get(link)
+        if future is None:
+            future = asyncio.ensure_future(self._fetch(link))
+            self._inflight[link] = future
+            future.add_done_callback(lambda _: self._inflight.pop(link, None))
+        meta = await asyncio.shield(future)
+        return meta
+
+    async def _fetch(self, link):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            data = await self._download(link)
+        meta = parse_torrent(data)
+        self._store(meta)
+        self._links[link] = meta["infohash"]
+        while len(self._links) > self.max_entries:
+            self._links.popitem(last=False)
+        return meta
+
+    async def _download(self, url):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        for _ in range(5):
+            async with self._session.get(url, allow_redirects=False, timeout=timeout) as response:
+                if response.status in (301, 302, 303, 307, 308):
+                    url = response.headers.get("Location", "")
+                    if not url.startswith(("http://", "https://")):
+                        raise MetadataUnavailable("this release is only available as a magnet link")
+                    continue
+                response.raise_for_status()
+                if response.content_length and response.content_length > self.max_bytes:
+                    raise MetadataUnavailable("torrent file is too large")
+                data = bytearray()
+                async for chunk in response.content.iter_chunked(64 * 1024):
+                    data.extend(chunk)
+                    if len(data) > self.max_bytes:
+                        raise MetadataUnavailable("torrent file is too large")
+                return bytes(data)
+        raise MetadataUnavailable("too many redirects")
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
@@ -0,0 +1,203 @@
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import os
+import time
+
+from jackett import infohash
+from query import canonicalize
+from storage import atomic_write
+
+logger = logging.getLogger(__name__)
+
+
+def watch_key(query):
+    """Equivalent queries share one upstream poll."""
+    canonical = canonicalize(query)
+    return canonical.key if canonical.text else ""
+
+
+class SeenSet:
+    """Two-generation Bloom filter of infohashes already reported to a subscriber.
+
+    When the current generation fills up it becomes the previous one, so the
+    false-positive rate stays bounded without the set growing forever.
+    """
+
+    def __init__(self, bits=8192, hashes=4, capacity=800):
+        self.bits = bits
+        self.hashes = hashes
+        self.capacity = capacity
+        self.count = 0
+        self.current = bytearray(bits // 8)
+        self.previous = None
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    @staticmethod
+    def _test(data, positions):
+        return all(data[p >> 3] & (1 << (p & 7)) for p in positions)
+
+    def __contains__(self, key):
+        positions = self._positions(key)
+        if self._test(self.current, positions):
+            return True
+        return self.previous is not None and self._test(self.previous, positions)
+
+    def add(self, key):
+        if key in self:
+            return
+        if self.count >= self.capacity:
+            self.previous = self.current
+            self.current = bytearray(self.bits // 8)
+            self.count = 0
+        for p in self._positions(key):
+            self.current[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "current": base64.b64encode(bytes(self.current)).decode(),
+            "previous": base64.b64encode(bytes(self.previous)).decode() if self.previous else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        seen = cls()
+        seen.count = data.get("count", 0)
+        seen.current = bytearray(base64.b64decode(data["current"]))
+        if data.get("previous"):
+            seen.previous = bytearray(base64.b64decode(data["previous"]))
+        return seen
+
+
+class Subscription:
+    def __init__(self, chat_id, query, seen=None, primed=False):
+        self.chat_id = chat_id
+        self.query = query
+        self.key = watch_key(query)
+        self.seen = seen or SeenSet()
+        self.primed = primed
+
+    def to_dict(self):
+        return {
+            "chat_id": self.chat_id,
+            "query": self.query,
+            "seen": self.seen.to_dict(),
+            "primed": self.primed,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["chat_id"], data["query"], SeenSet.from_dict(data["seen"]), data.get("primed", False))
+
+
+class WatchStore:
+    def __init__(self, path):
+        self.path = path
+        self.subscriptions = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as file:
+                for item in json.load(file):
+                    sub = Subscription.from_dict(item)
+                    self.subscriptions[(sub.chat_id, sub.key)] = sub
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Could not load watches from {self.path}: {e}")
+
+    def save(self):
+        with atomic_write(self.path) as file:
+            json.dump([sub.to_dict() for sub in self.subscriptions.values()], file)
+
+    def add(self, chat_id, query):
+        key = watch_key(query)
+        if not key or (chat_id, key) in self.subscriptions:
+            return False
+        self.subscriptions[(chat_id, key)] = Subscription(chat_id, query)
+        self.save()
+        return True
+
+    def remove(self, chat_id, query):
+        removed = self.subscriptions.pop((chat_id, watch_key(query)), None)
+        if removed:
+            self.save()
+        return removed is not None
+
+    def for_chat(self, chat_id):
+        return [sub for (cid, _), sub in self.subscriptions.items() if cid == chat_id]
+
+    def groups(self):
+        groups = {}
+        for sub in self.subscriptions.values():
+            groups.setdefault(sub.key, []).append(sub)
+        return groups
+
+
+class WatchScheduler:
+    """Polls Jackett once per distinct watched query per interval.
+
+    Each query key gets a fixed offset inside the interval derived from its
+    hash, so polls are spread out instead of firing all at once.
+    """
+
+    def __init__(self, store, fetch, notify, interval=3600, tick=30, concurrency=2):
+        self.store = store
+        self.fetch = fetch
+        self.notify = notify
+        self.interval = interval
+        self.tick = tick
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._last_slot = {}
+
+    def _slot(self, key, now):
+        offset = int(hashlib.md5(key.encode()).hexdigest(), 16) % self.interval
+        return int((now - offset) // self.interval)
+
+    async def run(self):
+        while True:
+            now = time.time()
+            due = []
+            for key, subs in self.store.groups().items():
+                slot = self._slot(key, now)
+                last = self._last_slot.setdefault(key, slot if all(s.primed for s in subs) else None)
+                if last != slot:
+                    self._last_slot[key] = slot
+                    due.append((key, subs))
+            if due:
+                await asyncio.gather(*(self._poll(key, subs) for key, subs in due))
+                self.store.save()
+            await asyncio.sleep(self.tick)
+
+    async def _poll(self, key, subs):
+        async with self._semaphore:
+            try:
+                results = await self.fetch(subs[0].query)
+            except Exception as e:
+                logger.error(f"Watch poll failed for '{key}': {e}")
+                return
+        for sub in subs:
+            new_results = {}
+            for result in results:
+                result_id = infohash(result)
+                if result_id not in sub.seen:
+                    new_results.setdefault(result_id, result)
+            if sub.primed and new_results:
+                try:
+                    await self.notify(sub, list(new_results.values()))
+                except Exception as e:
+                    logger.error(f"Watch notify failed for chat {sub.chat_id}: {e}")
+                    continue
+            for result_id in new_results:
+                sub.seen.add(result_id)
+            sub.primed = True
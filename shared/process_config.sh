@@ -29,12 +29,10 @@ EOF
 echo "Environment variables saved to /app/shared/envs/.env"
 
 # Start the Telegram bot
-echo "Starting Telegram bot via webhook mode..."
-python /app/bot/bot.py
-echo "Succesfully deployed the bot
-
-# Optional: keep container alive for debugging
-tail -f /dev/null
+echo "Starting Telegram bot (BOT_MODE=${BOT_MODE:-auto})..."
+# exec so the bot becomes PID 1 and receives SIGTERM from `docker compose down`,
+# which lets it shut down cleanly and save its warm state.
+exec python /app/bot/bot.py
 
 
 # #!/bin/bash